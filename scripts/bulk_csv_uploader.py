@@ -23,6 +23,11 @@ You can set these in:
 Rate Limiting:
 The Google Sheets API has limits (60 writes/minute). To avoid hitting quota errors,
 this script adds delays between uploads. Use --rate-limit to control this.
+Tabs bound for the same sheet are written in batched requests (up to
+SHEETS_UPLOAD_BATCH_TABS per batch, default 20) unless --preserve-edits is
+set, which needs to read each tab first and so uploads file by file.
+Uploads run a few at a time (--workers, default 4); the --rate-limit
+spacing applies across all of them.
 
 Usage:
     python bulk_csv_uploader.py --folder ./data/my_csvs
@@ -39,10 +44,11 @@ Or to skip tabs that already exist:
 
 import os
 import sys
-import glob
 import argparse
+import threading
 import time
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
 # Try to load from .env file if it exists (for local development)
@@ -56,13 +62,19 @@ except ImportError:
     pass  # python-dotenv not installed, that's fine
 
 # Import the sheets_helper from the same directory
-from sheets_helper import write_to_sheet, get_sheets_service
+from sheets_helper import write_to_sheet, get_sheets_service, dataframe_to_sheet_values, TAB_FIELDS
 
 # Get sheet IDs from environment variables (GitHub Secrets or .env)
 SHEET_ID_BRAND = os.environ.get('GOOGLE_SHEET_ID_BRAND')
 SHEET_ID_CEO = os.environ.get('GOOGLE_SHEET_ID_CEO')
 SHEET_ID_DEFAULT = os.environ.get('GOOGLE_SHEET_ID')
 
+# Files uploaded concurrently; kept small so bursts stay under the Sheets write quota
+UPLOAD_WORKERS = int(os.environ.get('SHEETS_UPLOAD_WORKERS', '4'))
+
+# Tabs sent per batched request (keeps each request body a manageable size)
+UPLOAD_BATCH_TABS = int(os.environ.get('SHEETS_UPLOAD_BATCH_TABS', '20'))
+
 def detect_sheet_type(filename):
     """
     Detect which Google Sheet this file should go to based on filename.
@@ -106,8 +118,12 @@ def find_csv_files(folder_path):
     Returns:
         List of CSV file paths, sorted alphabetically
     """
-    csv_pattern = os.path.join(folder_path, '*.csv')
-    csv_files = sorted(glob.glob(csv_pattern))
+    # One scandir pass: DirEntry carries the name, path and file type without extra stat calls
+    with os.scandir(folder_path) as entries:
+        csv_files = sorted(
+            e.path for e in entries
+            if e.name.endswith('.csv') and not e.name.startswith('.') and e.is_file()
+        )
     
     if not csv_files:
         print(f"❌ No CSV files found in: {folder_path}")
@@ -120,6 +136,9 @@ def find_csv_files(folder_path):
     
     return csv_files
 
+# Google Sheets doesn't allow these in tab names: ? * [ ] ! # @ $ %
+_INVALID_SHEET_CHARS = str.maketrans('', '', '?*[]!#@$%')
+
 def csv_to_sheet_name(csv_filename):
     """
     Convert CSV filename to a valid Google Sheet tab name.
@@ -139,10 +158,8 @@ def csv_to_sheet_name(csv_filename):
     # Remove .csv extension
     name = csv_filename.replace('.csv', '')
     
-    # Remove problematic characters (Google Sheets doesn't allow: ? * [ ] ! # @ $ %)
-    invalid_chars = ['?', '*', '[', ']', '!', '#', '@', '$', '%']
-    for char in invalid_chars:
-        name = name.replace(char, '')
+    # Remove problematic characters in one pass (see _INVALID_SHEET_CHARS)
+    name = name.translate(_INVALID_SHEET_CHARS)
     
     # Truncate to 100 characters (Google's limit for sheet names)
     name = name[:100]
@@ -165,14 +182,171 @@ def sheet_tab_exists(sheet_id, sheet_name):
     """
     try:
         service = get_sheets_service()
-        spreadsheet = service.spreadsheets().get(spreadsheetId=sheet_id).execute()
+        spreadsheet = service.spreadsheets().get(spreadsheetId=sheet_id, fields=TAB_FIELDS).execute()
         sheet_exists = any(s['properties']['title'] == sheet_name for s in spreadsheet['sheets'])
         return sheet_exists
     except Exception as e:
         print(f"[WARN] Could not check if tab exists: {e}")
         return False
 
-def upload_csvs_to_sheet(folder_path, sheet_type_override=None, preserve_edits=False, rate_limit_delay=0, skip_existing=False, verbose=True):
+def a1_range(sheet_name, cells='A1'):
+    """A1-notation range for a tab, quoted so any tab name is safe."""
+    return "'" + sheet_name.replace("'", "''") + "'!" + cells
+
+def column_letter(n):
+    """Spreadsheet column letter for a 1-based column index (1 → A, 27 → AA)."""
+    letters = ''
+    while n > 0:
+        n, r = divmod(n - 1, 26)
+        letters = chr(ord('A') + r) + letters
+    return letters
+
+def stale_ranges(sheet_name, values):
+    """Ranges holding old data after `values` is written from A1: the rows
+    below it and the columns to its right (up to ZZ)."""
+    rows = len(values)
+    width = max((len(row) for row in values), default=0)
+    ranges = [a1_range(sheet_name, f'A{rows + 1}:ZZ')]
+    if rows and width < 702:
+        ranges.append(a1_range(sheet_name, f'{column_letter(width + 1)}1:ZZ{rows}'))
+    return ranges
+
+def upload_batch(target_sheet_id, batch, skip_existing=False, verbose=True):
+    """
+    Upload several CSVs to one Google Sheet using batched API calls.
+    
+    Why: write_to_sheet makes about four requests per tab (look up tabs,
+    create the tab, clear it, write it), so a folder of K files costs ~4K
+    requests against the per-minute write quota. A batch of tabs costs at
+    most four requests in total, however many files it holds.
+    
+    Tabs are written first and only the cells past the new data are cleared
+    afterwards, so a failed write never leaves a tab blank. If the batched
+    write fails, each tab is retried on its own so one bad tab doesn't fail
+    the rest.
+    
+    Args:
+        target_sheet_id: Google Sheet ID every file in the batch goes to
+        batch: List of (csv_path, sheet_type) tuples
+        skip_existing: Skip tabs that already exist (default: False)
+        verbose: Print progress messages
+        
+    Returns:
+        List of (sheet_type, outcome) tuples, where outcome is
+        'successful', 'failed' or 'skipped'
+    """
+    outcomes = []
+    tabs = []  # (sheet_type, csv_name, sheet_name, values)
+    for csv_path, sheet_type in batch:
+        csv_name = os.path.basename(csv_path)
+        try:
+            if verbose:
+                print(f"📖 Reading: {csv_name}")
+            df = pd.read_csv(csv_path)
+        except Exception as e:
+            print(f"   ❌ Error: {csv_name}: {e}\n")
+            outcomes.append((sheet_type, 'failed'))
+            continue
+        
+        if verbose:
+            sheet_type_display = f" [{sheet_type}]" if sheet_type != 'default' else ""
+            print(f"   └─ Loaded {len(df)} rows, {len(df.columns)} columns{sheet_type_display}")
+        tabs.append((sheet_type, csv_name, csv_to_sheet_name(csv_name), dataframe_to_sheet_values(df)))
+    
+    if not tabs:
+        return outcomes
+    
+    try:
+        service = get_sheets_service()
+        spreadsheet = service.spreadsheets().get(
+            spreadsheetId=target_sheet_id, fields=TAB_FIELDS
+        ).execute()
+        existing = {s['properties']['title'] for s in spreadsheet.get('sheets', [])}
+        
+        if skip_existing:
+            for sheet_type, csv_name, sheet_name, _ in tabs:
+                if sheet_name in existing:
+                    print(f"⏭️  Skipping: {csv_name} (tab '{sheet_name}' already exists)\n")
+                    outcomes.append((sheet_type, 'skipped'))
+            tabs = [t for t in tabs if t[2] not in existing]
+            if not tabs:
+                return outcomes
+        
+        # Create every missing tab in one request
+        missing = list(dict.fromkeys(t[2] for t in tabs if t[2] not in existing))
+        if missing:
+            service.spreadsheets().batchUpdate(
+                spreadsheetId=target_sheet_id,
+                body={'requests': [{'addSheet': {'properties': {'title': name}}} for name in missing]}
+            ).execute()
+            for name in missing:
+                print(f"[INFO] Created sheet tab: {name}")
+    except Exception as e:
+        print(f"   ❌ Batch of {len(tabs)} file(s) failed: {e}\n")
+        return outcomes + [(t[0], 'failed') for t in tabs]
+    
+    values_api = service.spreadsheets().values()
+    
+    # Write every tab in one request, then clear what's left of the old data
+    if verbose:
+        print(f"📤 Uploading {len(tabs)} tab(s) in one batch...")
+    try:
+        values_api.batchUpdate(
+            spreadsheetId=target_sheet_id,
+            body={
+                'valueInputOption': 'RAW',
+                'data': [{'range': a1_range(t[2]), 'values': t[3]} for t in tabs],
+            }
+        ).execute()
+        values_api.batchClear(
+            spreadsheetId=target_sheet_id,
+            body={'ranges': [r for t in tabs for r in stale_ranges(t[2], t[3])]}
+        ).execute()
+        written = tabs
+    except Exception as e:
+        print(f"   ⚠️  Batch write failed ({e}); retrying tab by tab")
+        written = []
+        for tab in tabs:
+            _, csv_name, sheet_name, values = tab
+            try:
+                values_api.update(
+                    spreadsheetId=target_sheet_id, range=a1_range(sheet_name),
+                    valueInputOption='RAW', body={'values': values}
+                ).execute()
+                values_api.batchClear(
+                    spreadsheetId=target_sheet_id,
+                    body={'ranges': stale_ranges(sheet_name, values)}
+                ).execute()
+            except Exception as tab_error:
+                print(f"   ❌ Error: {csv_name}: {tab_error}")
+                outcomes.append((tab[0], 'failed'))
+                continue
+            written.append(tab)
+    
+    for _, csv_name, sheet_name, values in written:
+        print(f"   ✅ Success: {csv_name} → '{sheet_name}' ({len(values) - 1} rows)")
+    print()
+    return outcomes + [(t[0], 'successful') for t in written]
+
+class _Throttle:
+    """Spaces calls at least `delay` seconds apart, across threads."""
+    
+    def __init__(self, delay):
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.next_start = 0.0
+    
+    def wait(self):
+        if self.delay <= 0:
+            return
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_start)
+            self.next_start = start + self.delay
+        if start > now:
+            time.sleep(start - now)
+
+def upload_csvs_to_sheet(folder_path, sheet_type_override=None, preserve_edits=False, rate_limit_delay=0, skip_existing=False, verbose=True, workers=UPLOAD_WORKERS):
     """
     Main function: upload all CSVs from a folder as separate sheet tabs.
     
@@ -185,16 +359,18 @@ def upload_csvs_to_sheet(folder_path, sheet_type_override=None, preserve_edits=F
     2. Detects which Google Sheet each belongs to
     3. Reads each CSV into pandas
     4. Checks if tab exists (if skip_existing=True)
-    5. Writes to the appropriate sheet tab
-    6. Waits between uploads to respect rate limits
+    5. Writes to the appropriate sheet tab (batched per sheet, or file by
+       file when preserving edits)
+    6. Spaces uploads out to respect rate limits
     
     Args:
         folder_path: Folder containing CSV files
         sheet_type_override: Force all files to 'brand', 'ceo', or None (auto-detect)
         preserve_edits: Whether to preserve existing data if tab already exists
-        rate_limit_delay: Seconds to wait between uploads (default: 0)
+        rate_limit_delay: Seconds to wait between uploads (per file, or per batch) (default: 0)
         skip_existing: Skip tabs that already exist (default: False)
         verbose: Print progress messages
+        workers: Number of files uploaded concurrently (default: SHEETS_UPLOAD_WORKERS or 4)
         
     Returns:
         Dictionary with results (successful, failed, skipped)
@@ -247,15 +423,18 @@ def upload_csvs_to_sheet(folder_path, sheet_type_override=None, preserve_edits=F
             print(f"   ⚠️  Override: All files → {sheet_type_override}")
         if rate_limit_delay > 0:
             print(f"   ⏱️  Rate limiting: {rate_limit_delay}s between uploads")
+        if workers > 1:
+            print(f"   🔀 Up to {workers} uploads at a time")
         if skip_existing:
             print(f"   ⏭️  Skip mode: Existing tabs will be skipped")
         print()
     
     results = {'successful': 0, 'failed': 0, 'skipped': 0, 'by_type': {'brand': 0, 'ceo': 0, 'default': 0}}
     
-    for idx, csv_path in enumerate(csv_files):
+    # Route every file up front; only the uploads themselves go to the pool
+    jobs = []
+    for csv_path in csv_files:
         csv_name = os.path.basename(csv_path)
-        sheet_name = csv_to_sheet_name(csv_name)
         
         # Determine target sheet
         if sheet_type_override:
@@ -275,11 +454,18 @@ def upload_csvs_to_sheet(folder_path, sheet_type_override=None, preserve_edits=F
             results['skipped'] += 1
             continue
         
+        jobs.append((csv_path, sheet_type, target_sheet_id))
+    
+    throttle = _Throttle(rate_limit_delay)
+    
+    def upload_one(csv_path, sheet_type, target_sheet_id):
+        csv_name = os.path.basename(csv_path)
+        sheet_name = csv_to_sheet_name(csv_name)
+        
         # Skip if tab already exists and skip_existing flag is set
         if skip_existing and sheet_tab_exists(target_sheet_id, sheet_name):
             print(f"⏭️  Skipping: {csv_name} (tab '{sheet_name}' already exists)\n")
-            results['skipped'] += 1
-            continue
+            return [(sheet_type, 'skipped')]
         
         try:
             # Read the CSV file
@@ -294,7 +480,8 @@ def upload_csvs_to_sheet(folder_path, sheet_type_override=None, preserve_edits=F
                 sheet_type_display = f" [{sheet_type}]" if sheet_type != 'default' else ""
                 print(f"   └─ Loaded {rows_count} rows, {cols_count} columns{sheet_type_display}")
             
-            # Write to Google Sheets
+            # Write to Google Sheets, spaced out by --rate-limit across all workers
+            throttle.wait()
             if verbose:
                 print(f"📤 Uploading to sheet: '{sheet_name}'...")
             
@@ -306,22 +493,42 @@ def upload_csvs_to_sheet(folder_path, sheet_type_override=None, preserve_edits=F
             )
             
             if success:
-                print(f"   ✅ Success!\n")
-                results['successful'] += 1
-                results['by_type'][sheet_type] += 1
-            else:
-                print(f"   ❌ Failed!\n")
-                results['failed'] += 1
+                print(f"   ✅ Success: {csv_name}\n")
+                return [(sheet_type, 'successful')]
+            print(f"   ❌ Failed: {csv_name}\n")
+            return [(sheet_type, 'failed')]
                 
         except Exception as e:
-            print(f"   ❌ Error: {e}\n")
-            results['failed'] += 1
-        
-        # Rate limiting: add delay between uploads (except after last file)
-        if rate_limit_delay > 0 and idx < len(csv_files) - 1:
-            if verbose:
-                print(f"⏱️  Waiting {rate_limit_delay}s to avoid hitting API rate limits...\n")
-            time.sleep(rate_limit_delay)
+            print(f"   ❌ Error: {csv_name}: {e}\n")
+            return [(sheet_type, 'failed')]
+    
+    def upload_many(target_sheet_id, batch):
+        throttle.wait()
+        return upload_batch(target_sheet_id, batch, skip_existing=skip_existing, verbose=verbose)
+    
+    if preserve_edits:
+        # Merging edits needs each tab's current contents, so go file by file
+        tasks = [(upload_one, job) for job in jobs]
+    else:
+        # Otherwise each spreadsheet's tabs go up in a few batched requests
+        by_sheet = {}
+        for csv_path, sheet_type, target_sheet_id in jobs:
+            by_sheet.setdefault(target_sheet_id, []).append((csv_path, sheet_type))
+        batch_size = max(1, UPLOAD_BATCH_TABS)
+        tasks = [
+            (upload_many, (target_sheet_id, sheet_jobs[i:i + batch_size]))
+            for target_sheet_id, sheet_jobs in by_sheet.items()
+            for i in range(0, len(sheet_jobs), batch_size)
+        ]
+    
+    # Each task is a few Sheets API round-trips; overlap them across tasks
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = [executor.submit(fn, *args) for fn, args in tasks]
+        for fut in as_completed(futures):
+            for sheet_type, outcome in fut.result():
+                results[outcome] += 1
+                if outcome == 'successful':
+                    results['by_type'][sheet_type] = results['by_type'].get(sheet_type, 0) + 1
     
     # Print summary
     print("\n" + "="*60)
@@ -371,6 +578,12 @@ if __name__ == '__main__':
         action='store_true',
         help='Skip tabs that already exist in Google Sheets (do not overwrite)'
     )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=UPLOAD_WORKERS,
+        help=f'Number of files to upload at the same time (default: {UPLOAD_WORKERS}). Use 1 for one at a time'
+    )
     parser.add_argument(
         '--quiet',
         action='store_true',
@@ -388,7 +601,8 @@ if __name__ == '__main__':
         preserve_edits=args.preserve_edits,
         rate_limit_delay=args.rate_limit,
         skip_existing=args.skip_existing,
-        verbose=not args.quiet
+        verbose=not args.quiet,
+        workers=args.workers
     )
     
     # Exit with appropriate code
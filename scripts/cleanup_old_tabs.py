@@ -20,7 +20,7 @@ import re
 from datetime import datetime, timedelta
 
 try:
-    from sheets_helper import get_sheets_service
+    from sheets_helper import get_sheets_service, TAB_FIELDS
     SHEETS_AVAILABLE = True
 except ImportError:
     SHEETS_AVAILABLE = False
@@ -41,13 +41,15 @@ PROTECTED_TABS = {
     'CEOSERPs-DailyCounts',
 }
 
+# Dated tabs start with YYYY-MM-DD-
+DATED_TAB_RE = re.compile(r'^(\d{4}-\d{2}-\d{2})-')
+
 def is_dated_tab(title: str) -> tuple[bool, str]:
     """
     Check if tab has date prefix (YYYY-MM-DD-...)
     Returns: (is_dated, date_string)
     """
-    # Match YYYY-MM-DD at start of title
-    match = re.match(r'^(\d{4}-\d{2}-\d{2})-', title)
+    match = DATED_TAB_RE.match(title)
     if match:
         return True, match.group(1)
     return False, None
@@ -65,7 +67,7 @@ def cleanup_old_tabs():
     
     try:
         service = get_sheets_service()
-        spreadsheet = service.spreadsheets().get(spreadsheetId=SPREADSHEET_ID).execute()
+        spreadsheet = service.spreadsheets().get(spreadsheetId=SPREADSHEET_ID, fields=TAB_FIELDS).execute()
         
         cutoff_date = (datetime.now() - timedelta(days=KEEP_DAYS)).strftime('%Y-%m-%d')
         print(f"Cutoff date: {cutoff_date}")
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+CSV output helpers.
+
+Output is written by pandas' to_csv through a large write buffer, so files
+keep the exact format (minimal quoting, float and bool spelling) of every
+CSV already committed under data/.
+"""
+from __future__ import annotations
+
+import csv
+import os
+from pathlib import Path
+from typing import List, Sequence, Union
+
+import pandas as pd
+
+# Write buffer for to_csv (default is 8 KiB)
+WRITE_BUFFER = 1 << 20
+
+def _pandas_to_csv(df: pd.DataFrame, path: Union[str, Path], mode: str = "w", header: bool = True) -> None:
+    # Explicit "\n" so output is identical on every platform
+    with open(path, mode, buffering=WRITE_BUFFER, newline="", encoding="utf-8") as fh:
+        df.to_csv(fh, index=False, header=header, lineterminator="\n")
+
+def write_csv(df: pd.DataFrame, path: Union[str, Path]) -> None:
+    """Write a DataFrame to CSV without its index."""
+    _pandas_to_csv(df, path)
+
+def append_csv(df: pd.DataFrame, path: Union[str, Path]) -> None:
+    """Append rows to an existing CSV, without writing a header."""
+    _pandas_to_csv(df, path, mode="a", header=False)
+
+def read_header(path: Union[str, Path]) -> List[str]:
+    """Column names from the first line of a CSV (lowercased)."""
+    with open(path, newline="", encoding="utf-8-sig") as fh:
+        return [c.strip().lower() for c in next(csv.reader(fh), [])]
+
+def read_last_row(path: Union[str, Path], block: int = 4096) -> List[str]:
+    """Fields of the last non-empty line of a CSV, read backwards from EOF."""
+    with open(path, "rb") as fh:
+        size = fh.seek(0, os.SEEK_END)
+        pos = size
+        tail = b""
+        while pos > 0:
+            step = min(block, pos)
+            pos -= step
+            fh.seek(pos)
+            tail = fh.read(step) + tail
+            lines = tail.rstrip(b"\r\n").split(b"\n")
+            if len(lines) > 1 or pos == 0:
+                return next(csv.reader([lines[-1].decode("utf-8-sig")]), [])
+    return []
+
+def upsert_csv_by_date(
+    df: pd.DataFrame,
+    path: Union[str, Path],
+    date_str: str,
+    sort_by: Sequence[str] = ("date",),
+) -> None:
+    """Replace one date's rows in a date-sorted CSV whose first column is date.
+
+    Existing lines are streamed and filtered on their "YYYY-MM-DD," prefix
+    rather than parsed, and the new rows are spliced in where their date sorts.
+    A date later than the last row's is simply appended, so daily runs and
+    in-order backfills never copy the file. Falls back to a full pandas
+    rewrite if the header doesn't match df.
+    """
+    path = Path(path)
+    if not path.exists():
+        write_csv(df.sort_values(list(sort_by), kind="stable"), path)
+        return
+
+    with open(path, newline="", encoding="utf-8") as fh:
+        header = next(csv.reader([fh.readline()]), [])
+    if header != list(df.columns):
+        old = pd.read_csv(path)
+        old = old[old["date"].astype(str) != date_str]
+        merged = pd.concat([old, df], ignore_index=True)
+        write_csv(merged.sort_values(list(sort_by), kind="stable"), path)
+        return
+
+    new_lines = df.sort_values(list(sort_by), kind="stable").to_csv(
+        index=False, header=False, lineterminator="\n"
+    )
+    last = read_last_row(path)
+    if last and last[0] != "date" and last[0] < date_str:
+        with open(path, "rb") as fh:
+            fh.seek(-1, os.SEEK_END)
+            ends_with_newline = fh.read(1) == b"\n"
+        with open(path, "a", newline="", encoding="utf-8") as out:
+            if not ends_with_newline:
+                out.write("\n")
+            out.write(new_lines)
+        return
+
+    # Tolerate a quoted date too, in case the file was written by another tool
+    prefixes = (f"{date_str},", f'"{date_str}",')
+    tmp = path.with_suffix(".tmp")
+    with open(path, newline="", encoding="utf-8") as src, \
+            open(tmp, "w", newline="", encoding="utf-8") as out:
+        out.write(src.readline())
+        pending = True
+        for line in src:
+            if line.startswith(prefixes):
+                continue
+            if pending and line.lstrip('"')[:10] > date_str:
+                out.write(new_lines)
+                pending = False
+            out.write(line if line.endswith("\n") else line + "\n")
+        if pending:
+            out.write(new_lines)
+    os.replace(tmp, path)
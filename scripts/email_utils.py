@@ -10,7 +10,14 @@ import requests
 from datetime import datetime, timedelta, date
 from zoneinfo import ZoneInfo
 from email.utils import format_datetime
+from functools import lru_cache
 from typing import List, Dict, Any, Optional
+
+try:
+    import orjson
+except ImportError:  # stdlib json fallback
+    orjson = None
+
 # --- Safe env helpwers ---
 def _get_int_env(name: str, default: int) -> int:
     val = os.environ.get(name)
@@ -41,6 +48,9 @@ def _ensure_parents(p: str) -> None:
 
 def read_last_alert_dates() -> Dict[str, str]:
     try:
+        if orjson is not None:
+            with open(LAST_ALERT_DATES_PATH, "rb") as f:
+                return orjson.loads(f.read())
         with open(LAST_ALERT_DATES_PATH, "r", encoding="utf-8") as f:
             return json.load(f)
     except FileNotFoundError:
@@ -50,14 +60,26 @@ def read_last_alert_dates() -> Dict[str, str]:
 
 def write_last_alert_dates(d: Dict[str, str]) -> None:
     _ensure_parents(LAST_ALERT_DATES_PATH)
+    if orjson is not None:
+        with open(LAST_ALERT_DATES_PATH, "wb") as f:
+            f.write(orjson.dumps(d, option=orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS))
+        return
     with open(LAST_ALERT_DATES_PATH, "w", encoding="utf-8") as f:
         json.dump(d, f, indent=2, sort_keys=True)
 
-def now_eastern_date_str() -> str:
+@lru_cache(maxsize=1024)
+def _parse_date(s: str) -> date:
+    # Many entities share the same last-alert date; parse each string once
+    return date.fromisoformat(s)
+
+def now_eastern_date() -> date:
     now = datetime.now(tz=EASTERN)
     if now.hour < SOFT_SHIFT_HOURS:
-        return (now.date() - timedelta(days=1)).isoformat()
-    return now.date().isoformat()
+        return now.date() - timedelta(days=1)
+    return now.date()
+
+def now_eastern_date_str() -> str:
+    return now_eastern_date().isoformat()
 
 def _compute_delivery_time_rfc2822(run_date_str: str, mode: str) -> Optional[str]:
     mode = (mode or ALERT_SEND_MODE or "same_morning").lower()
@@ -66,7 +88,7 @@ def _compute_delivery_time_rfc2822(run_date_str: str, mode: str) -> Optional[str
         today_9 = datetime(now_et.year, now_et.month, now_et.day, 9, 0, 0, tzinfo=EASTERN)
         return format_datetime(today_9) if now_et < today_9 else None
     # next_morning
-    run_date = datetime.fromisoformat(run_date_str).date()
+    run_date = date.fromisoformat(run_date_str)
     send_day = run_date + timedelta(days=1)
     send_time_et = datetime(send_day.year, send_day.month, send_day.day, 9, 0, 0, tzinfo=EASTERN)
     return format_datetime(send_time_et)
@@ -96,7 +118,7 @@ def send_mailgun_summary(
     subject = f"High Negative Sentiment Alert for {count} {plural}"
 
     # Body
-    content_html = [f"<p>The following {plural.lower()} have high negative sentiment for {run_date_str}:</p>", "<ul>"]
+    parts = [f"<p>The following {plural.lower()} have high negative sentiment for {run_date_str}:</p>", "<ul>"]
     for row in entities_to_alert:
         name = row.get("name")  # brand/company name
         ceo = row.get("ceo")    # may be None for Brand rows
@@ -108,9 +130,9 @@ def send_mailgun_summary(
 
         # If this is a CEO alert and we have a CEO name, display "CEO (Company)"
         display = f"{ceo} ({name})" if (entity_type == "CEO" and ceo) else name
-        content_html.append(f"<li><strong>{display}:</strong> {neg}/{tot} ({pct}%) negative articles.</li>")
-    content_html.append("</ul>")
-    content_html = "\n".join(content_html)
+        parts.append(f"<li><strong>{display}:</strong> {neg}/{tot} ({pct}%) negative articles.</li>")
+    parts.append("</ul>")
+    content_html = "\n".join(parts)
 
     # Delivery time (same-morning vs next-morning @ 9am ET)
     delivery_time = _compute_delivery_time_rfc2822(run_date_str, schedule_mode)
@@ -149,7 +171,9 @@ def check_and_send_alerts(
     schedule_mode: str | None = None,
 ) -> None:
     last_alerts = read_last_alert_dates()
-    today_str = now_eastern_date_str()
+    # Resolve today's Eastern date once rather than per entity
+    today_date = now_eastern_date()
+    today_str = today_date.isoformat()
     to_alert: List[Dict[str, Any]] = []
     for row in entities:
         name, neg, tot = row.get("name") or row.get("brand"), row.get("neg") or row.get("negative", 0), row.get("tot") or row.get("total", 0)
@@ -161,7 +185,7 @@ def check_and_send_alerts(
         prev = last_alerts.get(key)
         if prev:
             try:
-                days = (datetime.fromisoformat(today_str).date() - datetime.fromisoformat(prev).date()).days
+                days = (today_date - _parse_date(prev)).days
                 if days < ALERT_COOLDOWN_DAYS:
                     continue
             except Exception:
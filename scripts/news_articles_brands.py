@@ -8,18 +8,26 @@ This is the file students will edit to correct brand article sentiment.
 
 import argparse
 import csv
+import hashlib
 import os
+import random
 import re
+import shutil
 import sys
 import time
 import urllib.parse
 import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from datetime import datetime, timezone
 from pathlib import Path
-from bs4 import BeautifulSoup
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+from lxml import etree
 import pandas as pd
 
+from csv_utils import upsert_csv_by_date
+from sentiment_utils import label_sentiments
+
 # NEW: Import Google Sheets helper
 try:
     from sheets_helper import write_to_sheet
@@ -33,49 +41,102 @@ BASE = Path(__file__).parent.parent
 MAIN_ROSTER = BASE / "rosters" / "main-roster.csv"
 OUT_DIR = BASE / "data" / "processed_articles"
 OUT_DIR.mkdir(parents=True, exist_ok=True)
+RSS_CACHE_DIR = BASE / ".rss_cache"
 
 # NEW: Enable/disable Google Sheets writing
 WRITE_TO_SHEETS = os.environ.get('WRITE_TO_SHEETS', 'true').lower() == 'true'
 
 # Tunables (env overrides)
 MAX_PER_ALIAS = int(os.getenv("ARTICLES_MAX_PER_ALIAS", "50"))
+MAX_WORKERS = int(os.getenv("ARTICLES_MAX_WORKERS", "8"))
+CACHE_TTL_SEC = int(os.getenv("ARTICLES_CACHE_TTL_SEC", "3600"))  # 0 disables the feed cache
+
+USER_AGENT = "Mozilla/5.0 (compatible; Brand-NewsBot/1.0; +https://example.com/bot)"
+
+# Reuse one connection pool across all brand fetches
+SESSION = requests.Session()
+SESSION.headers.update({"User-Agent": USER_AGENT})
+# Retry transient feed errors (throttling, 5xx) with a short backoff on the pooled connection
+_adapter = HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=16,
+    max_retries=Retry(total=2, backoff_factor=0.3, status_forcelist=(429, 500, 502, 503, 504)),
+)
+SESSION.mount("https://", _adapter)
+SESSION.mount("http://", _adapter)
+
+# Static parts of the Google News search URL; only the query varies per brand
+RSS_PREFIX = "https://news.google.com/rss/search?q="
+RSS_SUFFIX = "&hl=en-US&gl=US&ceid=US:en"
+
+# Tolerate the occasional malformed entity the way BeautifulSoup's "xml" mode did
+_XML_PARSER = etree.XMLParser(recover=True, resolve_entities=False)
 
 def google_news_rss(q):
-    qs = urllib.parse.quote(q)
-    return f"https://news.google.com/rss/search?q={qs}&hl=en-US&gl=US&ceid=US:en"
+    return RSS_PREFIX + urllib.parse.quote(q) + RSS_SUFFIX
+
+def _cache_hour():
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d-%H")
+
+def _cache_path(url):
+    key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+    return RSS_CACHE_DIR / _cache_hour() / f"{key}.xml"
+
+def prune_rss_cache():
+    """Delete cached feeds from earlier hours; they can never be hit again."""
+    if not RSS_CACHE_DIR.exists():
+        return
+    hour = _cache_hour()
+    for entry in RSS_CACHE_DIR.iterdir():
+        if entry.is_dir():
+            if entry.name < hour:
+                shutil.rmtree(entry, ignore_errors=True)
+        else:
+            # Flat files left by the old cache layout
+            entry.unlink(missing_ok=True)
 
-def classify(headline, analyzer):
-    s = analyzer.polarity_scores(headline or "")
-    c = s["compound"]
-    if c >= 0.25:  return "positive"
-    if c <= -0.05: return "negative"
-    return "neutral"
+def fetch_feed(url, pause):
+    """Raw feed bytes for a URL, reusing a recent on-disk copy if present."""
+    cache_file = _cache_path(url) if CACHE_TTL_SEC > 0 else None
+    if cache_file is not None and cache_file.exists():
+        if time.time() - cache_file.stat().st_mtime < CACHE_TTL_SEC:
+            return cache_file.read_bytes()
 
-def fetch_one(brand, analyzer, date, pause=1.2):
+    try:
+        r = SESSION.get(url, timeout=15)
+        r.raise_for_status()
+    finally:
+        time.sleep(random.uniform(0, pause))  # be respectful; jitter spreads out the workers
+
+    if cache_file is not None:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp = cache_file.with_suffix(".tmp")
+        tmp.write_bytes(r.content)
+        tmp.replace(cache_file)
+    return r.content
+
+def fetch_one(brand, date, pause=1.2):
     url = google_news_rss(f'"{brand}"')
-    r = requests.get(url, timeout=15)
-    r.raise_for_status()
-    soup = BeautifulSoup(r.text, "xml")
+    # Hand the raw bytes to lxml so it decodes per the XML declaration
+    root = etree.fromstring(fetch_feed(url, pause), parser=_XML_PARSER)
     out = []
-    for item in soup.find_all("item"):
-        title = (item.title.text or "").strip()
-        link  = (item.link.text  or "").strip()
+    for item in root.iterfind(".//item"):
+        title = (item.findtext("title") or "").strip()
+        link  = (item.findtext("link")  or "").strip()
         try:
             if "url=" in link:
                 link = urllib.parse.parse_qs(urllib.parse.urlparse(link).query).get("url", [link])[0]
         except Exception:
             pass
-        source = (item.source.text or "").strip() if item.source else ""
-        sent   = classify(title, analyzer)
+        source = (item.findtext("source") or "").strip()
         out.append({
             "company": brand,
             "title": title,
             "url": link,
             "source": source,
             "date": date,
-            "sentiment": sent
+            "sentiment": ""  # labelled for the whole run in main()
         })
-    time.sleep(pause)  # be respectful
     return out[:MAX_PER_ALIAS]  # cap results
 
 def load_companies_from_roster():
@@ -125,6 +186,7 @@ def main():
     
     # Set output file path
     out_file = OUT_DIR / f"{date}-brand-articles-modal.csv"
+    prune_rss_cache()
     
     if not MAIN_ROSTER.exists():
         print(f"ERROR: {MAIN_ROSTER} not found", file=sys.stderr)
@@ -134,14 +196,24 @@ def main():
     print(f"Loaded {len(brands)} companies from {MAIN_ROSTER}")
     print(f"Processing articles for date: {date}")
     
-    analyzer = SentimentIntensityAnalyzer()
+    # Fetch feeds concurrently (network-bound), then keep rows in roster order
+    results = {}
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        futures = {executor.submit(fetch_one, b, date): i for i, b in enumerate(brands)}
+        for fut in as_completed(futures):
+            i = futures[fut]
+            try:
+                results[i] = fut.result()
+            except Exception as e:
+                print(f"[WARN] {brands[i]}: {e}", file=sys.stderr)
 
     rows = []
-    for b in brands:
-        try:
-            rows.extend(fetch_one(b, analyzer, date))
-        except Exception as e:
-            print(f"[WARN] {b}: {e}", file=sys.stderr)
+    for i in sorted(results):
+        rows.extend(results[i])
+
+    # Score every headline of the run in one batch
+    for row, sent in zip(rows, label_sentiments([r["title"] for r in rows])):
+        row["sentiment"] = sent
 
     # Write to CSV
     with out_file.open("w", newline="", encoding="utf-8") as f:
@@ -162,36 +234,25 @@ def main():
             
             # Calculate daily aggregation by company
             if not modal_df.empty:
-                daily_df = (
-                    modal_df.groupby("company", as_index=False)
-                    .agg(
-                        total=("company", "size"),
-                        negative_articles=("sentiment", lambda s: (s == "negative").sum()),
-                        neutral_articles=("sentiment", lambda s: (s == "neutral").sum()),
-                        positive_articles=("sentiment", lambda s: (s == "positive").sum()),
-                    )
+                # One C-level cross-tabulation instead of a lambda per sentiment per group
+                sizes = modal_df.groupby("company").size()
+                counts = (
+                    pd.crosstab(modal_df["company"], modal_df["sentiment"])
+                    .reindex(index=sizes.index, columns=["negative", "neutral", "positive"], fill_value=0)
+                    .add_suffix("_articles")
                 )
+                counts.insert(0, "total", sizes)
+                daily_df = counts.rename_axis(index="company", columns=None).reset_index()
                 daily_df.insert(0, "date", date)
             else:
                 daily_df = pd.DataFrame(columns=["date", "company", "total", "negative_articles", "neutral_articles", "positive_articles"])
             
-            # Create rolling index (read existing, merge, sort)
+            # Update the rolling index in place: stream out this date's old lines,
+            # splice in the new rows, then load the result for the Sheets rollup
             rollup_path = OUT_DIR / "brand-articles-daily-counts-chart.csv"
-            if rollup_path.exists():
-                rollup_df = pd.read_csv(rollup_path)
-                # Remove any rows for this date
-                rollup_df = rollup_df[rollup_df["date"] != date]
-                # Add new data
-                rollup_df = pd.concat([rollup_df, daily_df], ignore_index=True)
-            else:
-                rollup_df = daily_df.copy()
-            
-            # Sort by date and company
-            rollup_df = rollup_df.sort_values(["date", "company"]).reset_index(drop=True)
-            
-            # Save rollup to CSV
             rollup_path.parent.mkdir(parents=True, exist_ok=True)
-            rollup_df.to_csv(rollup_path, index=False)
+            upsert_csv_by_date(daily_df, rollup_path, date, sort_by=["date", "company"])
+            rollup_df = pd.read_csv(rollup_path)
             print(f"[OK] Updated rolling index → {rollup_path}")
             
             # Write all three sheets to Google Sheets
@@ -9,19 +9,35 @@ This is the file students will edit to correct CEO article sentiment.
 
 from __future__ import annotations
 import argparse
+import hashlib
 import os
 import time
 import html
+import io
+import json
+import random
+import shutil
 import sys
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from datetime import datetime, timezone
-from urllib.parse import quote_plus, urlparse
+from urllib.parse import quote_plus
 
 import argparse
 import pandas as pd
 import requests
-import feedparser
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from lxml import etree
+
+from csv_utils import upsert_csv_by_date, write_csv
+from sentiment_utils import label_sentiments
+
+try:
+    import orjson
+except ImportError:  # stdlib json fallback
+    orjson = None
 
 # NEW: Import Google Sheets helper
 try:
@@ -36,18 +52,38 @@ BASE = Path(__file__).parent.parent
 MAIN_ROSTER = BASE / "rosters" / "main-roster.csv"
 OUT_DIR = BASE / "data" / "processed_articles"
 OUT_DIR.mkdir(parents=True, exist_ok=True)
+RSS_CACHE_DIR = BASE / ".rss_cache"
+# Per-day raw feed items, one JSONL per alias, so an interrupted run can resume
+RAW_ITEMS_DIR = BASE / ".raw_items"
 
 # NEW: Enable/disable Google Sheets writing
 WRITE_TO_SHEETS = os.environ.get('WRITE_TO_SHEETS', 'true').lower() == 'true'
 
 USER_AGENT = "Mozilla/5.0 (compatible; CEO-NewsBot/1.0; +https://example.com/bot)"
-RSS_TMPL = "https://news.google.com/rss/search?q={query}&hl=en-US&gl=US&ceid=US:en"
+# Static parts of the Google News search URL; only the query varies per alias
+RSS_PREFIX = "https://news.google.com/rss/search?q="
+RSS_SUFFIX = "&hl=en-US&gl=US&ceid=US:en"
 
 # Tunables (env overrides)
 MAX_PER_ALIAS = int(os.getenv("ARTICLES_MAX_PER_ALIAS", "25"))
 SLEEP_SEC = float(os.getenv("ARTICLES_SLEEP_SEC", "0.35"))
+MAX_WORKERS = int(os.getenv("ARTICLES_MAX_WORKERS", "8"))
+CACHE_TTL_SEC = int(os.getenv("ARTICLES_CACHE_TTL_SEC", "3600"))  # 0 disables the feed cache
+QUERY_BATCH = int(os.getenv("ARTICLES_QUERY_BATCH", "1"))  # >1 ORs that many aliases into one feed
 TARGET_DATE = os.getenv("ARTICLES_DATE", "").strip()
 
+# One pooled session shared by all fetch workers (HTTP keep-alive)
+SESSION = requests.Session()
+SESSION.headers.update({"User-Agent": USER_AGENT})
+# Retry transient feed errors (throttling, 5xx) with a short backoff on the pooled connection
+_adapter = HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=16,
+    max_retries=Retry(total=2, backoff_factor=0.3, status_forcelist=(429, 500, 502, 503, 504)),
+)
+SESSION.mount("https://", _adapter)
+SESSION.mount("http://", _adapter)
+
 def target_date() -> str:
     if TARGET_DATE:
         try:
@@ -57,25 +93,33 @@ def target_date() -> str:
             print(f"WARNING: invalid ARTICLES_DATE={TARGET_DATE!r}; falling back to today.")
     return datetime.now(timezone.utc).strftime("%Y-%m-%d")
 
+ROSTER_COLUMNS = frozenset({"ceo", "company", "ceo alias"})
+
 def read_roster(path: Path) -> pd.DataFrame:
     """Read CEO roster from main-roster.csv"""
     if not path.exists():
         raise FileNotFoundError(f"Missing roster file: {path}")
     
-    df = pd.read_csv(path, encoding="utf-8-sig")
+    # Only the three columns we use, read as plain strings (no type inference)
+    df = pd.read_csv(
+        path,
+        encoding="utf-8-sig",
+        usecols=lambda c: c.strip().lower() in ROSTER_COLUMNS,
+        dtype=str,
+    )
     cols = {c.strip().lower(): c for c in df.columns}
 
     def col(name: str) -> str:
-        for k, v in cols.items():
-            if k == name.lower():
-                return v
-        raise KeyError(f"Expected column '{name}' in {path.name}")
+        try:
+            return cols[name]
+        except KeyError:
+            raise KeyError(f"Expected column '{name}' in {path.name}") from None
 
     ceo_col = col("ceo")
     company_col = col("company")
     alias_col = col("ceo alias")
 
-    out = df[[alias_col, ceo_col, company_col]].copy()
+    out = df.reindex(columns=[alias_col, ceo_col, company_col])
     out.columns = ["alias", "ceo", "company"]
     out["alias"] = out["alias"].astype(str).str.strip()
     out["ceo"] = out["ceo"].astype(str).str.strip()
@@ -86,61 +130,176 @@ def read_roster(path: Path) -> pd.DataFrame:
         raise ValueError("No valid CEO rows after normalization.")
     return out.drop_duplicates()
 
-def fetch_rss(query: str) -> feedparser.FeedParserDict:
-    url = RSS_TMPL.format(query=quote_plus(query))
-    headers = {"User-Agent": USER_AGENT}
-    resp = requests.get(url, headers=headers, timeout=20)
-    resp.raise_for_status()
-    return feedparser.parse(resp.content)
-
-def label_sentiment(analyzer: SentimentIntensityAnalyzer, text: str) -> str:
-    s = analyzer.polarity_scores(text or "")
-    c = s.get("compound", 0.0)
-    if c >= 0.25:
-        return "positive"
-    if c <= -0.05:
-        return "negative"
-    return "neutral"
-
-def extract_source(entry) -> str:
+def parse_rss_items(content: bytes, limit: int) -> list[dict]:
+    """Pull title/link/source from the first `limit` RSS <item>s.
+
+    lxml's iterparse streams the document in C (releasing the GIL for the fetch
+    workers), so each item is read and cleared as soon as it closes instead of
+    building the full feed tree first.
+    """
+    items = []
+    for _, elem in etree.iterparse(io.BytesIO(content), events=("end",), tag="item", recover=True):
+        items.append({
+            "title": elem.findtext("title") or "",
+            "link": elem.findtext("link") or elem.findtext("guid") or "",
+            "source": elem.findtext("source") or "",
+        })
+        elem.clear()
+        if len(items) >= limit:
+            break
+    return items
+
+def _cache_hour() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d-%H")
+
+def _cache_path(query: str) -> Path:
+    key = hashlib.sha1(query.encode("utf-8")).hexdigest()
+    return RSS_CACHE_DIR / _cache_hour() / f"{key}.xml"
+
+def prune_rss_cache() -> None:
+    """Delete cached feeds from earlier hours; they can never be hit again."""
+    if not RSS_CACHE_DIR.exists():
+        return
+    hour = _cache_hour()
+    for entry in RSS_CACHE_DIR.iterdir():
+        if entry.is_dir():
+            if entry.name < hour:
+                shutil.rmtree(entry, ignore_errors=True)
+        else:
+            # Flat files left by the old cache layout
+            entry.unlink(missing_ok=True)
+
+def fetch_rss(query: str, limit: int = MAX_PER_ALIAS) -> list[dict]:
+    """Fetch and parse the feed for a query, reusing a recent on-disk copy if present."""
+    cache_file = _cache_path(query) if CACHE_TTL_SEC > 0 else None
+    if cache_file is not None and cache_file.exists():
+        if time.time() - cache_file.stat().st_mtime < CACHE_TTL_SEC:
+            return parse_rss_items(cache_file.read_bytes(), limit)
+
+    url = RSS_PREFIX + quote_plus(query) + RSS_SUFFIX
     try:
-        src = entry.get("source", {}).get("title", "") or ""
-    except Exception:
-        src = ""
+        resp = SESSION.get(url, timeout=20)
+        resp.raise_for_status()
+    finally:
+        # Small per-worker jitter instead of a global pause between aliases
+        time.sleep(random.uniform(0, SLEEP_SEC))
+
+    if cache_file is not None:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp = cache_file.with_suffix(".tmp")
+        tmp.write_bytes(resp.content)
+        tmp.replace(cache_file)
+    return parse_rss_items(resp.content, limit)
+
+@lru_cache(maxsize=8192)
+def host_of(link: str) -> str:
+    """Lowercased host of a URL without a leading www. (cheap manual parse)."""
+    i = link.find("://")
+    host = link[i + 3:] if i >= 0 else link
+    host = host.split("/", 1)[0].split("?", 1)[0].split("#", 1)[0]
+    host = host.rpartition("@")[2].partition(":")[0]
+    return host.lower().removeprefix("www.")
+
+def extract_source(item: dict) -> str:
+    src = item["source"].strip()
     if src:
-        return str(src).strip()
-    link = entry.get("link") or entry.get("id") or ""
-    try:
-        host = urlparse(link).hostname or ""
-        return host.replace("www.", "")
-    except Exception:
-        return ""
+        return src
+    return host_of(item["link"].strip())
 
-def build_articles_for_alias(alias: str, ceo: str, company: str, analyzer) -> list[dict]:
+def _raw_items_path(out_date: str, alias: str) -> Path:
+    key = hashlib.sha1(alias.encode("utf-8")).hexdigest()
+    return RAW_ITEMS_DIR / out_date / f"{key}.jsonl"
+
+def save_raw_items(path: Path, items: list[dict]) -> None:
+    if orjson is not None:
+        blob = b"".join(orjson.dumps(it) + b"\n" for it in items)
+    else:
+        blob = "".join(json.dumps(it, ensure_ascii=False) + "\n" for it in items).encode("utf-8")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_bytes(blob)
+    tmp.replace(path)
+
+def load_raw_items(path: Path) -> list[dict]:
+    loads = orjson.loads if orjson is not None else json.loads
+    return [loads(line) for line in path.read_bytes().splitlines() if line]
+
+def load_or_fetch_items(query: str, out_date: str, limit: int = MAX_PER_ALIAS) -> list[dict] | None:
+    """Feed items for a query, from today's raw JSONL if a previous run saved it."""
+    raw_path = _raw_items_path(out_date, query)
+    if raw_path.exists():
+        # Already fetched earlier today (e.g. a rerun after a crash)
+        return load_raw_items(raw_path)
     try:
-        feed = fetch_rss(alias)
+        items = fetch_rss(query, limit)
     except Exception as e:
-        print(f"ERROR fetching RSS for {alias!r}: {e}")
+        print(f"ERROR fetching RSS for {query!r}: {e}")
+        return None
+    # An empty feed is often throttling; don't let it stick for the rest of the day
+    if items:
+        save_raw_items(raw_path, items)
+    return items
+
+def prune_raw_items(out_date: str) -> None:
+    """Delete saved raw items from days before out_date."""
+    if not RAW_ITEMS_DIR.exists():
+        return
+    for day_dir in RAW_ITEMS_DIR.iterdir():
+        if day_dir.is_dir() and day_dir.name < out_date:
+            shutil.rmtree(day_dir, ignore_errors=True)
+
+def article_row(item: dict, title: str, ceo: str, company: str) -> dict:
+    return {
+        "ceo": ceo,
+        "company": company,
+        "title": title,
+        "url": item["link"].strip(),
+        "source": extract_source(item),
+        "sentiment": "",
+    }
+
+def build_articles_for_alias(alias: str, ceo: str, company: str, out_date: str) -> list[dict]:
+    items = load_or_fetch_items(alias, out_date)
+    if items is None:
         return []
 
     rows = []
-    for entry in (feed.entries or [])[:MAX_PER_ALIAS]:
-        title = html.unescape(entry.get("title", "")).strip()
-        link = (entry.get("link") or entry.get("id") or "").strip()
-        source = extract_source(entry)
+    for item in items:
+        title = html.unescape(item["title"]).strip()
         if not title:
             continue
-        sent = label_sentiment(analyzer, title)
-        rows.append({
-            "ceo": ceo,
-            "company": company,
-            "title": title,
-            "url": link,
-            "source": source,
-            "sentiment": sent,
-        })
+        rows.append(article_row(item, title, ceo, company))
     return rows
 
+def build_articles_for_batch(batch: list[tuple[int, tuple]], out_date: str) -> dict[int, list[dict]]:
+    """
+    Fetch one OR-joined feed for several roster rows and split it back out.
+
+    Each headline goes to the row whose CEO name appears in it; when several
+    do, the company name breaks the tie, and headlines that stay ambiguous
+    (or match nobody) are dropped.
+    """
+    query = " OR ".join(f"({row.alias})" for _, row in batch)
+    out: dict[int, list[dict]] = {i: [] for i, _ in batch}
+    items = load_or_fetch_items(query, out_date, MAX_PER_ALIAS * len(batch))
+    if items is None:
+        return out
+
+    for item in items:
+        title = html.unescape(item["title"]).strip()
+        if not title:
+            continue
+        low = title.lower()
+        hits = [(i, row) for i, row in batch if row.ceo.lower() in low]
+        if len(hits) > 1:
+            hits = [(i, row) for i, row in hits if row.company.lower() in low]
+        if len(hits) != 1:
+            continue
+        i, row = hits[0]
+        if len(out[i]) < MAX_PER_ALIAS:
+            out[i].append(article_row(item, title, row.ceo, row.company))
+    return out
+
 def main() -> int:
     parser = argparse.ArgumentParser(description="Fetch CEO news articles and analyze sentiment")
     # NEW: Add skip-sheets flag
@@ -151,38 +310,61 @@ def main() -> int:
     out_date = target_date()
     out_path = OUT_DIR / f"{out_date}-ceo-articles-modal.csv"
     print(f"Building articles for {out_date} → {out_path}")
+    prune_raw_items(out_date)
+    prune_rss_cache()
 
     try:
         roster = read_roster(MAIN_ROSTER)
     except Exception as e:
         print(f"FATAL: {e}")
         # Still write an empty file
-        pd.DataFrame(columns=["ceo","company","title","url","source","sentiment"]).to_csv(out_path, index=False)
+        write_csv(pd.DataFrame(columns=["ceo","company","title","url","source","sentiment"]), out_path)
         return 1
 
-    analyzer = SentimentIntensityAnalyzer()
     all_rows: list[dict] = []
 
-    for i, row in roster.iterrows():
-        alias = row["alias"]
-        ceo = row["ceo"]
-        company = row["company"]
-        if not alias:
-            continue
-        print(f"[{i+1}/{len(roster)}] {alias}")
-        rows = build_articles_for_alias(alias, ceo, company, analyzer)
-        all_rows.extend(rows)
-        time.sleep(SLEEP_SEC)
+    # Fetching is network-bound, so overlap the requests across a thread pool.
+    # Results are collected per roster position to keep the output order stable.
+    results: dict[int, list[dict]] = {}
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        futures = {}
+        todo = [(i, row) for i, row in enumerate(roster.itertuples(index=False)) if row.alias]
+        if QUERY_BATCH > 1:
+            for start in range(0, len(todo), QUERY_BATCH):
+                batch = todo[start:start + QUERY_BATCH]
+                fut = executor.submit(build_articles_for_batch, batch, out_date)
+                futures[fut] = (None, f"{len(batch)} aliases from {batch[0][1].alias}")
+        else:
+            for i, row in todo:
+                fut = executor.submit(build_articles_for_alias, row.alias, row.ceo, row.company, out_date)
+                futures[fut] = (i, row.alias)
+        for done, fut in enumerate(as_completed(futures), start=1):
+            i, alias = futures[fut]
+            if i is None:
+                results.update(fut.result())
+            else:
+                results[i] = fut.result()
+            print(f"[{done}/{len(futures)}] {alias}")
+
+    # De-duplicate on (ceo, title, url), keeping the first occurrence in roster order
+    seen: set[tuple[str, str, str]] = set()
+    for i in sorted(results):
+        for r in results[i]:
+            key = (r["ceo"], r["title"], r["url"])
+            if key in seen:
+                continue
+            seen.add(key)
+            all_rows.append(r)
 
-    # De-duplicate
     if all_rows:
         df = pd.DataFrame(all_rows)
-        df = df.drop_duplicates(subset=["ceo","title","url"]).reset_index(drop=True)
+        # Score every de-duplicated headline in one batch
+        df["sentiment"] = label_sentiments(df["title"].tolist())
     else:
         df = pd.DataFrame(columns=["ceo","company","title","url","source","sentiment"])
 
     out_path.parent.mkdir(parents=True, exist_ok=True)
-    df.to_csv(out_path, index=False)
+    write_csv(df, out_path)
     print(f"✔ Wrote {len(df):,} rows → {out_path}")
     
     # ===================================================================
@@ -195,37 +377,29 @@ def main() -> int:
             
             # Calculate daily aggregation by CEO
             if not modal_df.empty:
-                daily_df = (
-                    modal_df.groupby("ceo", as_index=False)
-                    .agg(
-                        total=("ceo", "size"),
-                        negative_articles=("sentiment", lambda s: (s == "negative").sum()),
-                        neutral_articles=("sentiment", lambda s: (s == "neutral").sum()),
-                        positive_articles=("sentiment", lambda s: (s == "positive").sum()),
-                        company=("company", lambda s: s.mode()[0] if not s.mode().empty else ""),
-                    )
+                # One C-level cross-tabulation instead of a lambda per sentiment per group
+                sizes = modal_df.groupby("ceo").size()
+                counts = (
+                    pd.crosstab(modal_df["ceo"], modal_df["sentiment"])
+                    .reindex(index=sizes.index, columns=["negative", "neutral", "positive"], fill_value=0)
+                    .add_suffix("_articles")
                 )
+                counts.insert(0, "total", sizes)
+                # Most frequent company per CEO (ties -> alphabetical, like Series.mode)
+                pairs = modal_df.groupby(["ceo", "company"]).size().rename("n").reset_index()
+                top = pairs.sort_values(["ceo", "n", "company"], ascending=[True, False, True]).drop_duplicates("ceo")
+                counts["company"] = top.set_index("ceo")["company"].reindex(counts.index).fillna("")
+                daily_df = counts.rename_axis(index="ceo", columns=None).reset_index()
                 daily_df.insert(0, "date", out_date)
             else:
                 daily_df = pd.DataFrame(columns=["date", "ceo", "total", "negative_articles", "neutral_articles", "positive_articles", "company"])
             
-            # Create rolling index (read existing, merge, sort)
+            # Update the rolling index in place: stream out this date's old lines,
+            # splice in the new rows, then load the result for the Sheets rollup
             rollup_path = OUT_DIR / "ceo-articles-daily-counts-chart.csv"
-            if rollup_path.exists():
-                rollup_df = pd.read_csv(rollup_path)
-                # Remove any rows for this date
-                rollup_df = rollup_df[rollup_df["date"] != out_date]
-                # Add new data
-                rollup_df = pd.concat([rollup_df, daily_df], ignore_index=True)
-            else:
-                rollup_df = daily_df.copy()
-            
-            # Sort by date and CEO
-            rollup_df = rollup_df.sort_values(["date", "ceo"]).reset_index(drop=True)
-            
-            # Save rollup to CSV
             rollup_path.parent.mkdir(parents=True, exist_ok=True)
-            rollup_df.to_csv(rollup_path, index=False)
+            upsert_csv_by_date(daily_df, rollup_path, out_date, sort_by=["date", "ceo"])
+            rollup_df = pd.read_csv(rollup_path)
             print(f"[OK] Updated rolling index → {rollup_path}")
             
             # Write all three sheets to Google Sheets
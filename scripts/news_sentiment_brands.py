@@ -14,6 +14,8 @@ from datetime import date, timedelta
 
 import pandas as pd
 
+from csv_utils import read_header, read_last_row
+
 # NEW: Import Google Sheets helper
 try:
     from sheets_helper import write_brand_articles_to_sheets
@@ -105,23 +107,28 @@ def write_daily(dstr: str, agg: dict):
     
     return df
 
+def read_daily_index():
+    """Rows of the rolling index, all values as strings."""
+    if not DAILY_INDEX.exists():
+        return []
+    with DAILY_INDEX.open(newline="", encoding="utf-8") as fh:
+        return list(csv.DictReader(fh))
+
 def upsert_daily_index(dstr: str, agg: dict):
-    """Update rolling index and return complete DataFrame for Sheets."""
+    """Update rolling index and return complete DataFrame for Sheets.
+
+    When dstr sorts after every date already in the index (the normal daily
+    run), today's rows are appended without reading the rest of the file and
+    None is returned; read_daily_index() loads the full index if needed.
+    """
     DAILY_INDEX.parent.mkdir(parents=True, exist_ok=True)
-    
-    rows = []
-    if DAILY_INDEX.exists():
-        with DAILY_INDEX.open(newline="", encoding="utf-8") as fh:
-            rows = list(csv.DictReader(fh))
 
-    # Drop existing rows for this date
-    rows = [r for r in rows if r.get("date") != dstr]
-    
-    # Add new rows with standardized column names
-    for company, c in agg.items():
+    # New rows with standardized column names
+    new_rows = []
+    for company, c in sorted(agg.items()):
         total = c["total"]
         neg_pct = (c["negative"] / total) if total else 0.0
-        rows.append({
+        new_rows.append({
             "date": dstr,
             "company": company,
             "positive_articles": str(c["positive"]),
@@ -131,6 +138,19 @@ def upsert_daily_index(dstr: str, agg: dict):
             "neg_pct":  f"{neg_pct:.6f}",
         })
 
+    if DAILY_INDEX.exists() and read_header(DAILY_INDEX) == INDEX_FIELDS:
+        last = read_last_row(DAILY_INDEX)
+        if last and last[0] != "date" and last[0] < dstr:
+            with DAILY_INDEX.open("a", newline="", encoding="utf-8") as fh:
+                w = csv.DictWriter(fh, fieldnames=INDEX_FIELDS)
+                w.writerows(new_rows)
+            print(f"[OK] Appended {len(new_rows)} rows to {DAILY_INDEX}")
+            return None
+
+    # Drop existing rows for this date
+    rows = [r for r in read_daily_index() if r.get("date") != dstr]
+    rows.extend(new_rows)
+
     # Sort by date, then company
     rows.sort(key=lambda r: (r["date"], r["company"]))
 
@@ -186,6 +206,8 @@ def process_one(dstr: str, skip_sheets=False):
         try:
             print(f"\n[INFO] Writing brand article data to Google Sheets...")
             print(f"[INFO] Preserving student sentiment edits from {dstr}...")
+            if rollup_df is None:
+                rollup_df = pd.DataFrame(read_daily_index(), columns=INDEX_FIELDS)
             success = write_brand_articles_to_sheets(
                 rows_df=rows_df,             # ✅ NOW PASSING: Individual articles (modal data with student edits!)
                 daily_df=daily_df,           # Summary counts by company and sentiment
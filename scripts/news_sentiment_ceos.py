@@ -11,10 +11,13 @@ import argparse
 import os
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 
+import numpy as np
 import pandas as pd
 
+from csv_utils import append_csv, read_header, read_last_row, write_csv
+
 # NEW: Import Google Sheets helper
 try:
     from sheets_helper import write_ceo_articles_to_sheets
@@ -29,41 +32,53 @@ DEFAULT_ARTICLES_DIR = "data/processed_articles"
 DEFAULT_DAILY_DIR = "data/processed_articles"
 DEFAULT_OUT = "data/daily_counts/ceo-articles-daily-counts-chart.csv"
 
+# Standardized column order of the rolling master index
+MASTER_COLUMNS = ["date", "ceo", "company", "positive_articles", "neutral_articles", "negative_articles", "total", "neg_pct", "theme", "alias"]
+
 # NEW: Enable/disable Google Sheets writing
 WRITE_TO_SHEETS = os.environ.get('WRITE_TO_SHEETS', 'true').lower() == 'true'
 
+SENTIMENTS = ["positive", "neutral", "negative"]
+
 # ---------------------- Helpers ---------------------------- #
 
 def iso_today_utc() -> str:
     return datetime.now(timezone.utc).strftime("%Y-%m-%d")
 
+ROSTER_COLUMNS = frozenset({"ceo alias", "alias", "ceo", "company"})
+
 def load_roster(path: Path) -> pd.DataFrame:
     """Load and normalize roster data."""
     if not path.exists():
         raise FileNotFoundError(f"Roster file not found: {path}")
 
-    df = pd.read_csv(path, encoding="utf-8-sig")
+    # Only the columns we use, read as plain strings (no type inference)
+    df = pd.read_csv(
+        path,
+        encoding="utf-8-sig",
+        usecols=lambda c: c.strip().lower() in ROSTER_COLUMNS,
+        dtype=str,
+    )
     cols = {c.strip().lower(): c for c in df.columns}
 
     def col(*names: str) -> str:
         for name in names:
-            for k, v in cols.items():
-                if k == name.lower():
-                    return v
+            if name in cols:
+                return cols[name]
         raise KeyError(f"Expected one of {names} columns in {path}")
 
     alias_col = col("ceo alias", "alias")
     ceo_col = col("ceo")
     company_col = col("company")
 
-    out = df[[alias_col, ceo_col, company_col]].copy()
+    out = df.reindex(columns=[alias_col, ceo_col, company_col])
     out.columns = ["alias", "ceo", "company"]
     
     for c in ["alias", "ceo", "company"]:
-        out[c] = out[c].astype(str).fillna("").str.strip()
+        out[c] = out[c].fillna("").str.strip()
     
     out = out[(out["alias"] != "") & (out["ceo"] != "") & (out["alias"] != "nan")]
-    out = out.drop_duplicates(subset=["ceo"]).reset_index(drop=True)
+    out = out[~out["ceo"].duplicated()].reset_index(drop=True)
     
     if out.empty:
         raise ValueError("No valid CEO rows after normalization.")
@@ -76,17 +91,20 @@ def load_articles(articles_dir: Path, date_str: str) -> pd.DataFrame:
     if not f.exists():
         return pd.DataFrame(columns=cols)
 
-    df = pd.read_csv(f)
+    # Only the columns we use, as strings; skips type inference on the rest
+    df = pd.read_csv(f, usecols=lambda c: c.lower() in cols, dtype=str)
     if df.empty:
         return pd.DataFrame(columns=cols)
 
     df = df.rename(columns={c: c.lower() for c in df.columns})
+    # One pass per column; sentiment is lowercased here and nowhere else
     for c in cols:
         if c not in df.columns:
             df[c] = ""
-    for c in ["ceo", "company", "title", "url", "source", "sentiment"]:
-        df[c] = df[c].astype(str).fillna("").str.strip()
-    df["sentiment"] = df["sentiment"].str.lower()
+        elif c == "sentiment":
+            df[c] = df[c].fillna("").str.strip().str.lower()
+        else:
+            df[c] = df[c].fillna("").str.strip()
     return df[cols]
 
 def aggregate_counts(roster: pd.DataFrame, articles: pd.DataFrame, date_str: str) -> pd.DataFrame:
@@ -94,68 +112,95 @@ def aggregate_counts(roster: pd.DataFrame, articles: pd.DataFrame, date_str: str
     base = roster.copy()
 
     if not articles.empty:
-        grp = (
-            articles.assign(sentiment=articles["sentiment"].str.lower())
-            .groupby("ceo", dropna=False)["sentiment"]
-            .value_counts()
-            .unstack(fill_value=0)
-            .rename(columns={"positive": "positive", "neutral": "neutral", "negative": "negative"})
-        )
-        for col in ["positive", "neutral", "negative"]:
-            if col not in grp.columns:
-                grp[col] = 0
-        grp = grp[["positive", "neutral", "negative"]]
-        base = base.merge(grp, how="left", left_on="ceo", right_index=True)
+        # load_articles already lowercased sentiment; as a categorical the pivot
+        # runs on integer codes and always yields all three columns (anything
+        # else becomes NaN and is not counted)
+        sentiment = pd.Categorical(articles["sentiment"], categories=SENTIMENTS)
+        grp = pd.crosstab(articles["ceo"], sentiment, dropna=False).reindex(columns=SENTIMENTS, fill_value=0)
+        # Hash lookup of each roster CEO in the pivot instead of a merge
+        counts = grp.reindex(base["ceo"], fill_value=0).to_numpy(np.int64)
     else:
-        base["positive"] = 0
-        base["neutral"] = 0
-        base["negative"] = 0
-
-    base[["positive", "neutral", "negative"]] = base[["positive", "neutral", "negative"]].fillna(0).astype(int)
-    base["total"] = base["positive"] + base["neutral"] + base["negative"]
-    base["neg_pct"] = base.apply(
-        lambda r: round(100.0 * (r["negative"] / r["total"]), 1) if r["total"] > 0 else 0.0, axis=1
-    )
-
-    base["theme"] = ""
-
-    # Use standardized column names: positive_articles, neutral_articles, negative_articles
-    out = base[["ceo", "company", "positive", "neutral", "negative", "total", "neg_pct", "theme", "alias"]].copy()
-    out.columns = ["ceo", "company", "positive_articles", "neutral_articles", "negative_articles", "total", "neg_pct", "theme", "alias"]
-    out.insert(0, "date", date_str)
-    return out
+        counts = np.zeros((len(base), len(SENTIMENTS)), dtype=np.int64)
+
+    # Totals and shares on the raw (n_ceos, 3) count matrix
+    for i, col in enumerate(SENTIMENTS):
+        base[col] = counts[:, i]
+    tot = counts.sum(axis=1)
+    neg = counts[:, SENTIMENTS.index("negative")]
+    base["total"] = tot
+    # Divide only where total > 0; other rows keep the preset 0.0
+    share = np.zeros(len(tot))
+    np.divide(neg, tot, out=share, where=tot > 0)
+    base["neg_pct"] = np.round(100.0 * share, 1)
+
+    # Use standardized column names: positive_articles, neutral_articles, negative_articles.
+    # Built in one constructor rather than slice + rename + insert
+    return pd.DataFrame({
+        "date": date_str,
+        "ceo": base["ceo"].to_numpy(),
+        "company": base["company"].to_numpy(),
+        "positive_articles": base["positive"].to_numpy(),
+        "neutral_articles": base["neutral"].to_numpy(),
+        "negative_articles": base["negative"].to_numpy(),
+        "total": base["total"].to_numpy(),
+        "neg_pct": base["neg_pct"].to_numpy(),
+        "theme": "",
+        "alias": base["alias"].to_numpy(),
+    })
 
 def write_daily_file(daily_dir: Path, date_str: str, daily_rows: pd.DataFrame) -> Path:
     """Write per-day CSV file."""
     daily_dir.mkdir(parents=True, exist_ok=True)
     path = daily_dir / f"{date_str}-ceo-articles-table.csv"
-    daily_rows.to_csv(path, index=False)
+    write_csv(daily_rows, path)
     return path
 
-def upsert_master_index(out_path: Path, date_str: str, daily_rows: pd.DataFrame) -> pd.DataFrame:
-    """Update rolling index CSV and return complete DataFrame."""
+def _read_master_csv(out_path: Path) -> pd.DataFrame:
+    master = pd.read_csv(out_path)
+    master = master.rename(columns={c: c.lower() for c in master.columns})
+    # Use standardized column names
+    for col in MASTER_COLUMNS:
+        if col not in master.columns:
+            master[col] = [] if col in ["theme", "alias"] else 0
+    return master[MASTER_COLUMNS]
+
+def upsert_master_index(out_path: Path, date_str: str, daily_rows: pd.DataFrame) -> Optional[pd.DataFrame]:
+    """Update rolling index CSV.
+
+    When date_str sorts after every date already in the index (the normal
+    daily run), the new rows are appended without re-reading the index and
+    None is returned. Otherwise the index is rebuilt and the complete
+    DataFrame returned.
+    """
     out_path.parent.mkdir(parents=True, exist_ok=True)
-    
+
+    if out_path.exists() and read_header(out_path) == MASTER_COLUMNS:
+        last = read_last_row(out_path)
+        if last and last[0] != "date" and last[0] < date_str:
+            append_csv(daily_rows.sort_values("ceo"), out_path)
+            return None
+
     if out_path.exists():
-        master = pd.read_csv(out_path)
-        master = master.rename(columns={c: c.lower() for c in master.columns})
-        # Use standardized column names
-        expected = ["date", "ceo", "company", "positive_articles", "neutral_articles", "negative_articles", "total", "neg_pct", "theme", "alias"]
-        for col in expected:
-            if col not in master.columns:
-                master[col] = [] if col in ["theme", "alias"] else 0
-        master = master[expected]
-        master = master[master["date"].astype(str) != date_str]
-        master = pd.concat([master, daily_rows], ignore_index=True)
+        master = _read_master_csv(out_path)
+        keep = (master["date"].astype(str) != date_str).to_numpy()
+        # Stitch kept + new rows column by column; avoids concat's index/column alignment
+        master = pd.DataFrame({
+            col: np.concatenate([master[col].to_numpy()[keep], daily_rows[col].to_numpy()])
+            for col in MASTER_COLUMNS
+        })
     else:
         master = daily_rows.copy()
 
     master["date"] = master["date"].astype(str)
     master = master.sort_values(["date", "ceo"]).reset_index(drop=True)
-    master.to_csv(out_path, index=False)
+    write_csv(master, out_path)
     
     return master
 
+def read_master_index(out_path: Path) -> pd.DataFrame:
+    """Full rolling index, for when upsert_master_index only appended."""
+    return pd.read_csv(out_path)
+
 # ----------------------- CLI / Main ------------------------ #
 
 def parse_args(argv: List[str] | None = None) -> argparse.Namespace:
@@ -187,7 +232,10 @@ def main(argv: List[str] | None = None) -> int:
     master_df = upsert_master_index(Path(args.out), args.date, daily_rows)
 
     print(f"✔ Wrote per-day file:  {daily_path}")
-    print(f"✔ Updated master index: {args.out} (rows: {len(master_df):,})")
+    if master_df is None:
+        print(f"✔ Updated master index without a full rewrite: {args.out}")
+    else:
+        print(f"✔ Updated master index: {args.out} (rows: {len(master_df):,})")
     
     # ===================================================================
     # NEW: Write to Google Sheets
@@ -195,9 +243,10 @@ def main(argv: List[str] | None = None) -> int:
     if WRITE_TO_SHEETS and not args.skip_sheets and SHEETS_HELPER_AVAILABLE:
         try:
             print(f"\n[INFO] Writing CEO article data to Google Sheets...")
-            articles_for_modal = load_articles(Path(args.articles_dir), args.date)
+            if master_df is None:
+                master_df = read_master_index(Path(args.out))
             success = write_ceo_articles_to_sheets(
-                rows_df=articles_for_modal,        # Individual articles for modal
+                rows_df=articles,                  # Individual articles for modal
                 daily_df=daily_rows,               # Daily aggregates for table
                 rollup_df=master_df,               # Rolling index for chart
                 target_date=args.date
@@ -14,13 +14,19 @@ import argparse
 import csv
 import io
 import os
+import re
 from datetime import datetime
-from typing import Dict, Tuple, Set
+from typing import Dict, FrozenSet, Set
 from urllib.parse import urlparse
 
+import numpy as np
 import pandas as pd
 import requests
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from csv_utils import upsert_csv_by_date
+from sentiment_utils import label_sentiments
 
 # NEW: Import Google Sheets helper (gracefully fails if packages not installed)
 try:
@@ -45,7 +51,11 @@ OUT_ROLLUP = "data/daily_counts/brand-serps-daily-counts-chart.csv"
 
 FORCE_POSITIVE_IF_CONTROLLED = True
 
-ALWAYS_CONTROLLED_DOMAINS: Set[str] = {
+# Compound-score cutoffs for SERP titles
+SERP_POS_THRESHOLD = 0.2
+SERP_NEG_THRESHOLD = -0.1
+
+ALWAYS_CONTROLLED_DOMAINS: FrozenSet[str] = frozenset({
     "facebook.com",
     "instagram.com",
     "twitter.com",
@@ -53,7 +63,13 @@ ALWAYS_CONTROLLED_DOMAINS: Set[str] = {
     "linkedin.com",
     "play.google.com",
     "apps.apple.com",
-}
+})
+
+# Pooled connection with retries on transient S3 errors
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(
+    max_retries=Retry(total=2, backoff_factor=0.3, status_forcelist=(429, 500, 502, 503, 504)),
+))
 
 # NEW: Enable/disable Google Sheets writing
 WRITE_TO_SHEETS = os.environ.get('WRITE_TO_SHEETS', 'true').lower() == 'true'
@@ -88,9 +104,10 @@ def ensure_dirs() -> None:
 
 def fetch_csv_from_s3(url: str) -> pd.DataFrame | None:
     try:
-        resp = requests.get(url, timeout=45)
+        resp = SESSION.get(url, timeout=45)
         resp.raise_for_status()
-        return pd.read_csv(io.StringIO(resp.text))
+        # Parse the body bytes directly instead of decoding a text copy first
+        return pd.read_csv(io.BytesIO(resp.content), encoding="utf-8-sig")
     except Exception as e:
         print(f"[WARN] Could not fetch {url} — {e}")
         return None
@@ -101,15 +118,18 @@ def fetch_csv_from_s3(url: str) -> pd.DataFrame | None:
 def _hostname(url: str) -> str:
     try:
         host = (urlparse(url).hostname or "").lower()
-        return host.replace("www.", "")
+        return host.removeprefix("www.")
     except Exception:
         return ""
 
-def _norm_token(s: str) -> str:
-    return "".join(ch for ch in (s or "").lower() if ch.isalnum())
+def _clean_text(col: pd.Series) -> pd.Series:
+    return col.fillna("").astype(str).str.strip()
 
-def _norm_domain_for_name_match(host: str) -> str:
-    return "".join(ch for ch in (host or "") if ch.isalnum())
+# [^\W_] is exactly str.isalnum
+_NON_ALNUM_RE = re.compile(r"[\W_]+")
+
+def _norm_token(s: str) -> str:
+    return _NON_ALNUM_RE.sub("", (s or "").lower())
 
 # -----------------------
 # Roster loading
@@ -152,40 +172,33 @@ def load_roster_domains(path: str = MAIN_ROSTER_PATH) -> Set[str]:
 # -----------------------
 # Control classification
 # -----------------------
-def classify_control(company: str, url: str, roster_domains: Set[str]) -> bool:
-    host = _hostname(url)
-    if not host:
-        return False
+# urlsplit's netloc as one regex (userinfo and port dropped like .hostname),
+# so a URL column is parsed with a vectorized .str.extract
+_HOST_RE = re.compile(r"^(?:[A-Za-z][A-Za-z0-9+.\-]*:)?//(?:[^/?#]*@)?\[?([^/?#:\]]*)")
+_WWW_RE = re.compile(r"^www\.")
 
-    for good in ALWAYS_CONTROLLED_DOMAINS:
-        if host == good or host.endswith("." + good):
-            return True
+def _suffix_pattern(domains) -> re.Pattern:
+    """Matches a host equal to, or a subdomain of, any of the domains."""
+    return re.compile(r"(?:^|\.)(?:" + "|".join(re.escape(d) for d in sorted(domains)) + r")$")
 
-    for rd in roster_domains:
-        if host == rd or host.endswith("." + rd):
-            return True
+_ALWAYS_CONTROLLED_RE = _suffix_pattern(ALWAYS_CONTROLLED_DOMAINS)
 
-    brand_token = _norm_token(company)
-    if brand_token:
-        host_token = _norm_domain_for_name_match(host)
-        if brand_token in host_token:
-            return True
+def classify_control(companies: pd.Series, urls: pd.Series, roster_domains: Set[str]) -> pd.Series:
+    """Controlled flag for every SERP row, computed column-wise."""
+    host = urls.fillna("").astype(str).str.extract(_HOST_RE, expand=False).fillna("")
+    host = host.str.lower().str.replace(_WWW_RE, "", regex=True)
 
-    return False
+    controlled = host.str.contains(_ALWAYS_CONTROLLED_RE).to_numpy()
+    if roster_domains:
+        controlled = controlled | host.str.contains(_suffix_pattern(roster_domains)).to_numpy()
 
-# -----------------------
-# Sentiment
-# -----------------------
-def vader_label_on_title(analyzer: SentimentIntensityAnalyzer, title: str) -> Tuple[float, str]:
-    s = analyzer.polarity_scores(title or "")
-    c = s.get("compound", 0.0)
-    if c >= 0.2:
-        lab = "positive"
-    elif c <= -0.1:
-        lab = "negative"
-    else:
-        lab = "neutral"
-    return c, lab
+    # Brand name inside the host, both reduced to alphanumerics
+    companies = companies.fillna("").astype(str)
+    brand_token = companies.map({c: _norm_token(c) for c in companies.unique()}).to_numpy(dtype=str)
+    host_token = host.str.replace(_NON_ALNUM_RE, "", regex=True).to_numpy(dtype=str)
+    controlled = controlled | ((brand_token != "") & (np.char.find(host_token, brand_token) >= 0))
+
+    return pd.Series(controlled & (host != "").to_numpy(), index=urls.index)
 
 # -----------------------
 # Main processing
@@ -207,58 +220,51 @@ def process_for_date(target_date: str, skip_sheets: bool = False) -> None:
         if col not in raw.columns:
             raw[col] = ""
 
-    analyzer = SentimentIntensityAnalyzer()
-
-    processed_rows = []
-    for _, row in raw.iterrows():
-        company = str(row.get("company", "") or "").strip()
-        if not company:
-            continue
-
-        title = str(row.get("title", "") or "").strip()
-        url = str(row.get("link", "") or "").strip()
-        snippet = str(row.get("snippet", "") or "").strip()
-
-        pos_val = row.get("position", 0)
-        try:
-            position = int(float(pos_val) if pos_val not in (None, "") else 0)
-        except Exception:
-            position = 0
-
-        controlled = classify_control(company, url, roster_domains)
-
-        _, label = vader_label_on_title(analyzer, title)
-        if FORCE_POSITIVE_IF_CONTROLLED and controlled:
-            label = "positive"
-
-        processed_rows.append({
-            "date": target_date,
-            "company": company,
-            "title": title,
-            "url": url,
-            "position": position,
-            "snippet": snippet,
-            "sentiment": label,
-            "controlled": controlled,
-        })
-
-    if not processed_rows:
+    # Column-wise cleanup; rows without a company are skipped
+    company = _clean_text(raw["company"])
+    raw = raw[(company != "").to_numpy()]
+    if raw.empty:
         print(f"[WARN] No processed rows for {target_date}.")
         return
 
-    rows_df = pd.DataFrame(processed_rows)
+    position = pd.to_numeric(raw["position"], errors="coerce")
+    rows_df = pd.DataFrame({
+        "date": target_date,
+        "company": company[company != ""],
+        "title": _clean_text(raw["title"]),
+        "url": _clean_text(raw["link"]),
+        "position": position.where(np.isfinite(position), 0).astype(int),
+        "snippet": _clean_text(raw["snippet"]),
+    }).reset_index(drop=True)
+
+    controlled = classify_control(rows_df["company"], rows_df["url"], roster_domains)
+
+    labels = pd.Series(label_sentiments(
+        rows_df["title"].tolist(), pos_threshold=SERP_POS_THRESHOLD, neg_threshold=SERP_NEG_THRESHOLD
+    ))
+    if FORCE_POSITIVE_IF_CONTROLLED:
+        labels[controlled] = "positive"
+    rows_df["sentiment"] = labels
+    rows_df["controlled"] = controlled
+
     row_out_path = os.path.join(OUT_ROWS_DIR, f"{target_date}-brand-serps-modal.csv")
     rows_df.to_csv(row_out_path, index=False)
     print(f"[OK] Wrote row-level SERPs → {row_out_path}")
 
+    # Sentiment one-hots summed in the same groupby pass as the other counts
     agg = (
-        rows_df.groupby("company", as_index=False)
+        rows_df.assign(
+            negative_serp=rows_df["sentiment"].eq("negative"),
+            neutral_serp=rows_df["sentiment"].eq("neutral"),
+            positive_serp=rows_df["sentiment"].eq("positive"),
+        )
+        .groupby("company", as_index=False)
         .agg(
             total=("company", "size"),
             controlled=("controlled", "sum"),
-            negative_serp=("sentiment", lambda s: (s == "negative").sum()),
-            neutral_serp=("sentiment", lambda s: (s == "neutral").sum()),
-            positive_serp=("sentiment", lambda s: (s == "positive").sum()),
+            negative_serp=("negative_serp", "sum"),
+            neutral_serp=("neutral_serp", "sum"),
+            positive_serp=("positive_serp", "sum"),
         )
     )
     agg.insert(0, "date", target_date)
@@ -267,24 +273,8 @@ def process_for_date(target_date: str, skip_sheets: bool = False) -> None:
     agg.to_csv(daily_out_path, index=False)
     print(f"[OK] Wrote daily aggregate → {daily_out_path}")
 
-    if os.path.exists(OUT_ROLLUP):
-        roll = pd.read_csv(OUT_ROLLUP)
-        roll = roll[roll["date"] != target_date]
-        roll = pd.concat([roll, agg], ignore_index=True)
-    else:
-        roll = agg.copy()
-
-    cols = [
-        "date",
-        "company",
-        "total",
-        "controlled",
-        "negative_serp",
-        "neutral_serp",
-        "positive_serp",
-    ]
-    roll = roll[cols].sort_values(["date", "company"]).reset_index(drop=True)
-    roll.to_csv(OUT_ROLLUP, index=False)
+    # Replace this date's rows in the rolling index without re-parsing it
+    upsert_csv_by_date(agg, OUT_ROLLUP, target_date, sort_by=["date", "company"])
     print(f"[OK] Updated rolling index → {OUT_ROLLUP}")
 
     # ===================================================================
@@ -296,7 +286,7 @@ def process_for_date(target_date: str, skip_sheets: bool = False) -> None:
             success = write_serps_to_sheets(
                 rows_df=rows_df,
                 daily_df=agg,
-                rollup_df=roll,
+                rollup_df=pd.read_csv(OUT_ROLLUP),
                 target_date=target_date
             )
             if success:
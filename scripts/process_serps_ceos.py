@@ -14,12 +14,19 @@ import os
 import re
 import sys
 import datetime as dt
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from urllib.parse import urlparse
 
+import numpy as np
 import pandas as pd
 import requests
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from csv_utils import upsert_csv_by_date
+from sentiment_utils import label_sentiments
 
 # NEW: Import Google Sheets helper
 try:
@@ -45,19 +52,32 @@ INDEX_PATH = INDEX_DIR / "ceo-serps-daily-counts-chart.csv"
 for p in (OUT_DIR_ROWS, OUT_DIR_DAILY, INDEX_DIR):
     p.mkdir(parents=True, exist_ok=True)
 
+# Parallel S3 downloads during --backfill
+BACKFILL_WORKERS = int(os.getenv("SERPS_BACKFILL_WORKERS", "16"))
+
+# One connection pool for every S3 download in the run (backfills included)
+SESSION = requests.Session()
+_adapter = HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=16,
+    max_retries=Retry(total=2, backoff_factor=0.3, status_forcelist=(429, 500, 502, 503, 504)),
+)
+SESSION.mount("https://", _adapter)
+SESSION.mount("http://", _adapter)
+
 # NEW: Enable/disable Google Sheets writing
 WRITE_TO_SHEETS = os.environ.get('WRITE_TO_SHEETS', 'true').lower() == 'true'
 
 # Control rules
-CONTROLLED_SOCIAL_DOMAINS = {
+CONTROLLED_SOCIAL_DOMAINS = frozenset({
     "facebook.com", "linkedin.com", "instagram.com", "twitter.com", "x.com"
-}
-CONTROLLED_PATH_KEYWORDS = {
+})
+CONTROLLED_PATH_KEYWORDS = frozenset({
     "/leadership/", "/about/", "/governance/", "/team/", "/investors/", "/board-of-directors"
-}
-UNCONTROLLED_DOMAINS = {
+})
+UNCONTROLLED_DOMAINS = frozenset({
     "wikipedia.org", "youtube.com", "youtu.be", "tiktok.com"
-}
+})
 
 NEUTRALIZE_TITLE_TERMS = [
     r"\bflees\b",
@@ -68,18 +88,19 @@ NEUTRALIZE_TITLE_TERMS = [
 ]
 NEUTRALIZE_TITLE_RE = re.compile("|".join(NEUTRALIZE_TITLE_TERMS), flags=re.IGNORECASE)
 
-# ------------------------ Small helpers -----------------------
+# Compound-score cutoffs for SERP titles
+SERP_POS_THRESHOLD = 0.05
+SERP_NEG_THRESHOLD = -0.15
 
-def strip_neutral_terms_from_title(title: str) -> str:
-    s = str(title or "")
-    s = NEUTRALIZE_TITLE_RE.sub(" ", s)
-    s = re.sub(r"\s+", " ", s).strip()
-    return s
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9\s]+")
+_WS_RE = re.compile(r"\s+")
+
+# ------------------------ Small helpers -----------------------
 
 def norm(s: str) -> str:
     s = str(s or "").lower().strip()
-    s = re.sub(r"[^a-z0-9\s]+", " ", s)
-    s = re.sub(r"\s+", " ", s).strip()
+    s = _NON_ALNUM_RE.sub(" ", s)
+    s = _WS_RE.sub(" ", s).strip()
     return s
 
 LEGAL_SUFFIXES = {"inc", "inc.", "corp", "co", "co.", "llc", "plc", "ltd", "ltd.", "ag", "sa", "nv"}
@@ -91,21 +112,27 @@ def simplify_company(s: str) -> str:
 
 def read_csv_safely(text_or_path):
     try:
+        if isinstance(text_or_path, bytes):
+            return pd.read_csv(io.BytesIO(text_or_path), encoding="utf-8-sig")
         if isinstance(text_or_path, str) and "\n" in text_or_path:
             return pd.read_csv(io.StringIO(text_or_path))
         return pd.read_csv(text_or_path, encoding="utf-8-sig")
     except Exception:
+        if isinstance(text_or_path, bytes):
+            return pd.read_csv(io.BytesIO(text_or_path), engine="python",
+                               encoding="utf-8-sig", encoding_errors="replace")
         if isinstance(text_or_path, str) and "\n" in text_or_path:
             return pd.read_csv(io.StringIO(text_or_path), engine="python")
         return pd.read_csv(text_or_path, engine="python", encoding="utf-8-sig")
 
-def fetch_csv_text(url: str, timeout=30):
-    r = requests.get(url, timeout=timeout)
+def fetch_csv_bytes(url: str, timeout=30):
+    """Raw CSV body, or None on 404. pandas decodes it directly, so there is
+    no text copy and no charset sniffing of the whole file."""
+    r = SESSION.get(url, timeout=timeout)
     if r.status_code == 404:
         return None
     r.raise_for_status()
-    r.encoding = r.apparent_encoding or "utf-8"
-    return r.text
+    return r.content
 
 def load_roster_data():
     if not MAIN_ROSTER_PATH.exists():
@@ -116,9 +143,8 @@ def load_roster_data():
     
     def col(*names):
         for name in names:
-            for k, v in cols.items():
-                if k == name.lower():
-                    return v
+            if name in cols:
+                return cols[name]
         return None
 
     ceo_col = col("ceo")
@@ -129,19 +155,15 @@ def load_roster_data():
     if not (ceo_col and company_col):
         raise ValueError("Main roster must have CEO and Company columns")
 
-    ceo_to_company = {}
-    for _, row in df.iterrows():
-        ceo = str(row[ceo_col]).strip()
-        company = str(row[company_col]).strip()
-        if ceo and company and ceo != "nan" and company != "nan":
-            ceo_to_company[ceo] = company
+    s_ceo = df[ceo_col].astype(str).str.strip()
+    s_company = df[company_col].astype(str).str.strip()
+    mask = (s_ceo != "") & (s_company != "") & (s_ceo != "nan") & (s_company != "nan")
+    ceo_to_company = dict(zip(s_ceo[mask], s_company[mask]))
 
     alias_map = {}
     if alias_col:
-        for _, row in df.iterrows():
-            alias = str(row[alias_col]).strip()
-            ceo = str(row[ceo_col]).strip()
-            company = str(row[company_col]).strip()
+        s_alias = df[alias_col].astype(str).str.strip()
+        for alias, ceo, company in zip(s_alias, s_ceo, s_company):
             if alias and ceo and company and alias != "nan":
                 alias_map[norm(alias)] = (ceo, company)
 
@@ -158,7 +180,7 @@ def load_roster_data():
                         val = f"https://{val}"
                     parsed = urlparse(val)
                     host = (parsed.netloc or parsed.path or "").lower().strip()
-                    host = host.replace("www.", "")
+                    host = host.removeprefix("www.")
                     if host and "." in host:
                         controlled_domains.add(host)
                 except Exception:
@@ -184,63 +206,76 @@ def normalize_raw_columns(df: pd.DataFrame) -> pd.DataFrame:
     out["snippet"]     = df[sn_c].astype(str).str.strip() if sn_c else ""
     return out
 
-def resolve_ceo_company(query_alias: str, alias_map, ceo_to_company):
-    qn = norm(query_alias)
+def resolve_ceo_company(qn: str, alias_map, roster_tokens):
+    """(ceo, company) for one normalized query: exact alias, else the roster
+    entry with the most name/company tokens all contained in the query."""
     if qn in alias_map:
         return alias_map[qn]
 
     best = None
     best_score = 0
-    for ceo, comp in ceo_to_company.items():
-        tokens = set(f"{norm(ceo)} {simplify_company(comp)}".split())
-        if tokens.issubset(set(qn.split())):
+    q_tokens = set(qn.split())
+    for ceo, comp, tokens in roster_tokens:
+        if tokens.issubset(q_tokens):
             score = len(tokens)
             if score > best_score:
                 best = (ceo, comp)
                 best_score = score
     return best if best else ("", "")
 
-def classify_control(url: str, position, company: str, controlled_domains):
-    try:
-        parsed = urlparse(url or "")
-        domain = (parsed.netloc or "").lower().replace("www.", "")
-        path   = (parsed.path or "").lower()
-    except Exception:
-        domain, path = "", ""
-
-    if any(d in domain for d in UNCONTROLLED_DOMAINS):
-        return False
-
-    if domain in controlled_domains:
-        return True
-
-    comp_simple = simplify_company(company)
-    if comp_simple and comp_simple.replace(" ", "") in domain.replace(".", ""):
-        return True
-
-    if any(s in domain for s in CONTROLLED_SOCIAL_DOMAINS):
-        return True
-
-    if any(k in path for k in CONTROLLED_PATH_KEYWORDS):
-        return True
-
-    return False
-
-def vader_label(analyzer, row):
-    raw_text = (row.get("title") or "").strip()
-    text = strip_neutral_terms_from_title(raw_text)
-    if not text:
-        return "neutral"
-    score = analyzer.polarity_scores(text)["compound"]
-    if score >= 0.05:
-        return "positive"
-    if score <= -0.15:
-        return "negative"
-    return "neutral"
+def resolve_ceo_companies(query_alias: pd.Series, alias_map, ceo_to_company) -> pd.DataFrame:
+    """Resolve a whole query column, running the matcher once per distinct query."""
+    qn = (
+        query_alias.fillna("").astype(str).str.lower().str.strip()
+        .str.replace(_NON_ALNUM_RE, " ", regex=True)
+        .str.replace(_WS_RE, " ", regex=True)
+        .str.strip()
+    )
+    roster_tokens = [
+        (ceo, comp, set(f"{norm(ceo)} {simplify_company(comp)}".split()))
+        for ceo, comp in ceo_to_company.items()
+    ]
+    resolved = {q: resolve_ceo_company(q, alias_map, roster_tokens) for q in qn.unique()}
+    return pd.DataFrame(qn.map(resolved).tolist(), columns=["ceo", "company"], index=query_alias.index)
+
+# urlsplit's scheme / netloc / path split as one regex, so URL columns can be
+# parsed with vectorized .str.extract instead of urlparse per row
+_URL_PARTS_RE = re.compile(r"^(?:[A-Za-z][A-Za-z0-9+.\-]*:)?(?://([^/?#]*))?([^?#]*)")
+_WWW_RE = re.compile(r"^www\.")
+
+def _alternation(parts) -> re.Pattern:
+    return re.compile("|".join(re.escape(p) for p in sorted(parts)))
+
+_UNCONTROLLED_RE = _alternation(UNCONTROLLED_DOMAINS)
+_SOCIAL_RE = _alternation(CONTROLLED_SOCIAL_DOMAINS)
+_PATH_KEYWORD_RE = _alternation(CONTROLLED_PATH_KEYWORDS)
+
+def classify_control(urls: pd.Series, companies: pd.Series, controlled_domains) -> pd.Series:
+    """Controlled flag for every SERP row, computed column-wise."""
+    parts = urls.fillna("").astype(str).str.extract(_URL_PARTS_RE).fillna("")
+    domain = parts[0].str.lower().str.replace(_WWW_RE, "", regex=True)
+    path = parts[1].str.lower()
+
+    # simplify_company is per company, not per row
+    companies = companies.fillna("").astype(str)
+    simple = {c: simplify_company(c).replace(" ", "") for c in companies.unique()}
+    comp_key = companies.map(simple).to_numpy(dtype=str)
+    dom_key = domain.str.replace(".", "", regex=False).to_numpy(dtype=str)
+    comp_in_domain = (comp_key != "") & (np.char.find(dom_key, comp_key) >= 0)
+
+    controlled = (
+        domain.isin(controlled_domains).to_numpy()
+        | comp_in_domain
+        | domain.str.contains(_SOCIAL_RE).to_numpy()
+        | path.str.contains(_PATH_KEYWORD_RE).to_numpy()
+    )
+    controlled = controlled & ~domain.str.contains(_UNCONTROLLED_RE).to_numpy()
+    return pd.Series(controlled, index=urls.index)
 
 # ---------------------------- Core ----------------------------
 
-def process_one_date(date_str: str, alias_map, ceo_to_company, controlled_domains, skip_sheets=False):
+def process_one_date(date_str: str, alias_map, ceo_to_company, controlled_domains, skip_sheets=False,
+                     fetch=fetch_csv_bytes):
     day = dt.date.fromisoformat(date_str)
     if day < FIRST_AVAILABLE_DATE:
         print(f"[skip] {date_str} < first available ({FIRST_AVAILABLE_DATE})")
@@ -248,24 +283,26 @@ def process_one_date(date_str: str, alias_map, ceo_to_company, controlled_domain
 
     url = S3_TEMPLATE.format(date=date_str)
     print(f"[fetch] {url}")
-    text = fetch_csv_text(url)
-    if text is None:
+    body = fetch(url)
+    if body is None:
         print(f"[missing] No S3 file for {date_str}")
         return None
 
-    raw = read_csv_safely(text)
-    base = normalize_raw_columns(raw)
+    # normalize_raw_columns already returns a new frame, so annotate it in place
+    mapped = normalize_raw_columns(read_csv_safely(body))
+    mapped[["ceo", "company"]] = resolve_ceo_companies(mapped["query_alias"], alias_map, ceo_to_company)
 
-    mapped = base.copy()
-    mapped[["ceo", "company"]] = mapped.apply(
-        lambda r: pd.Series(resolve_ceo_company(r["query_alias"], alias_map, ceo_to_company)),
-        axis=1,
+    # Blank out terms VADER misreads in names/shows, then score the whole column
+    titles = (
+        mapped["title"].fillna("").astype(str)
+        .str.replace(NEUTRALIZE_TITLE_RE, " ", regex=True)
+        .str.replace(_WS_RE, " ", regex=True)
+        .str.strip()
     )
-
-    analyzer = SentimentIntensityAnalyzer()
-
-    mapped["sentiment"] = mapped.apply(lambda r: vader_label(analyzer, r), axis=1)
-    mapped["controlled"] = mapped.apply(lambda r: classify_control(r["url"], r["position"], r["company"], controlled_domains), axis=1)
+    mapped["sentiment"] = label_sentiments(
+        titles.tolist(), pos_threshold=SERP_POS_THRESHOLD, neg_threshold=SERP_NEG_THRESHOLD
+    )
+    mapped["controlled"] = classify_control(mapped["url"], mapped["company"], controlled_domains)
 
     mapped.loc[mapped["controlled"] == True, "sentiment"] = "positive"
 
@@ -284,38 +321,37 @@ def process_one_date(date_str: str, alias_map, ceo_to_company, controlled_domain
     rows_df.to_csv(rows_path, index=False)
     print(f"[write] {rows_path}")
 
-    def majority_company(series):
-        s = pd.Series(series).replace("", pd.NA).dropna()
-        if s.empty:
-            return ""
-        return s.mode().iloc[0]
-
-    ag = mapped.groupby("ceo", dropna=False).agg(
+    # Sentiment one-hots summed in the same groupby pass as the other counts
+    ag = mapped.assign(
+        negative_serp=mapped["sentiment"].eq("negative"),
+        neutral_serp=mapped["sentiment"].eq("neutral"),
+        positive_serp=mapped["sentiment"].eq("positive"),
+    ).groupby("ceo", dropna=False).agg(
         total=("sentiment", "size"),
         controlled=("controlled", "sum"),
-        negative_serp=("sentiment", lambda s: (s == "negative").sum()),
-        neutral_serp=("sentiment",  lambda s: (s == "neutral").sum()),
-        positive_serp=("sentiment", lambda s: (s == "positive").sum()),
-        company=("company", majority_company),
+        negative_serp=("negative_serp", "sum"),
+        neutral_serp=("neutral_serp", "sum"),
+        positive_serp=("positive_serp", "sum"),
     ).reset_index()
+
+    # Majority company per CEO (ties go to the alphabetically first, like mode())
+    named = mapped[mapped["company"] != ""]
+    top = (
+        named.groupby(["ceo", "company"]).size().reset_index(name="n")
+        .sort_values(["ceo", "n", "company"], ascending=[True, False, True])
+        .drop_duplicates("ceo")
+    )
+    ag["company"] = ag["ceo"].map(dict(zip(top["ceo"], top["company"]))).fillna("")
     ag.insert(0, "date", date_str)
 
     day_path = OUT_DIR_DAILY / f"{date_str}-ceo-serps-table.csv"
     ag.to_csv(day_path, index=False)
     print(f"[write] {day_path}")
 
-    if INDEX_PATH.exists():
-        idx = read_csv_safely(INDEX_PATH)
-        idx = idx[idx["date"] != date_str]
-        idx = pd.concat([idx, ag], ignore_index=True)
-    else:
-        idx = ag
-
-    idx["date"] = pd.to_datetime(idx["date"], errors="coerce")
-    idx = idx.sort_values(["date", "ceo"]).reset_index(drop=True)
-    idx["date"] = idx["date"].dt.strftime("%Y-%m-%d")
-    idx.to_csv(INDEX_PATH, index=False)
-    print(f"[update] {INDEX_PATH} ({len(idx)} rows total)")
+    # Replace this date's rows in the rolling index without re-parsing it;
+    # in-order backfills just append
+    upsert_csv_by_date(ag, INDEX_PATH, date_str, sort_by=["date", "ceo"])
+    print(f"[update] {INDEX_PATH}")
 
     # ===================================================================
     # NEW: Write to Google Sheets
@@ -326,7 +362,7 @@ def process_one_date(date_str: str, alias_map, ceo_to_company, controlled_domain
             success = write_ceo_serps_to_sheets(
                 rows_df=rows_df,
                 daily_df=ag,
-                rollup_df=idx,
+                rollup_df=read_csv_safely(INDEX_PATH),
                 target_date=date_str
             )
             if success:
@@ -351,10 +387,42 @@ def backfill(start: str, end: str, alias_map, ceo_to_company, controlled_domains
     d1 = dt.date.fromisoformat(end)
     if d0 > d1:
         d0, d1 = d1, d0
-    d = d0
-    while d <= d1:
-        process_one_date(d.isoformat(), alias_map, ceo_to_company, controlled_domains, skip_sheets)
-        d += dt.timedelta(days=1)
+    dates = [(d0 + dt.timedelta(days=i)).isoformat() for i in range((d1 - d0).days + 1)]
+
+    # Downloads overlap on a thread pool; processing stays serial and in date
+    # order because every day rewrites the shared rolling index. Only a small
+    # look-ahead window of downloads is in flight or held in memory at a time
+    urls = iter([S3_TEMPLATE.format(date=d) for d in dates if d >= FIRST_AVAILABLE_DATE.isoformat()])
+    window = deque()
+
+    with ThreadPoolExecutor(max_workers=BACKFILL_WORKERS) as ex:
+        def refill():
+            while len(window) < BACKFILL_WORKERS:
+                url = next(urls, None)
+                if url is None:
+                    return
+                window.append((url, ex.submit(fetch_csv_bytes, url)))
+
+        def fetch(url):
+            refill()
+            queued_url, fut = window.popleft()
+            if queued_url != url:
+                # Not the download we queued next; shouldn't happen, but stay correct
+                fut.cancel()
+                return fetch_csv_bytes(url)
+            body = fut.result()
+            refill()
+            return body
+
+        try:
+            for d in dates:
+                process_one_date(d, alias_map, ceo_to_company, controlled_domains, skip_sheets,
+                                 fetch=fetch)
+        except BaseException:
+            # Don't make the error wait on downloads nobody will use
+            for _, fut in window:
+                fut.cancel()
+            raise
 
 def main():
     ap = argparse.ArgumentParser(description="Process CEO SERPs with sentiment/control.")
@@ -14,7 +14,7 @@ def _load_counts(csv_path: str) -> pd.DataFrame | None:
         return None
     try:
         import pandas as pd
-        df = pd.read_csv(csv_path)
+        df = pd.read_csv(csv_path, dtype={"date": str})
 
         # --- normalize column names ---
         # which column holds the entity name?
@@ -40,7 +40,9 @@ def _load_counts(csv_path: str) -> pd.DataFrame | None:
             return None
 
         # coerce types
-        df["date"] = pd.to_datetime(df["date"], errors="coerce").dt.date
+        # dates are stored as YYYY-MM-DD, which already sorts and compares as a string
+        dates = df["date"].astype(str).str.strip().str[:10]
+        df["date"] = dates.where(dates.str.fullmatch(r"\d{4}-\d{2}-\d{2}"))
         df["neg"]  = pd.to_numeric(df["neg"], errors="coerce").fillna(0).astype(int)
         df["tot"]  = pd.to_numeric(df["tot"], errors="coerce").fillna(0).astype(int)
         return df
@@ -50,7 +52,7 @@ def _load_counts(csv_path: str) -> pd.DataFrame | None:
 
 
 def _prepare_entities_for_date(df: pd.DataFrame, entity_type: str) -> tuple[List[Dict[str, Any]], str] | None:
-    if df.empty:
+    if df["date"].isna().all():
         return None
     most_recent = df["date"].max()
     cur = df[df["date"] == most_recent].copy()
@@ -65,7 +67,7 @@ def _prepare_entities_for_date(df: pd.DataFrame, entity_type: str) -> tuple[List
         cur = cur.groupby("name", as_index=False).agg({"neg": "sum", "tot": "sum"})
         entities = cur.to_dict("records")
 
-    return entities, most_recent.isoformat()
+    return entities, most_recent
 
 def main() -> None:
     MAILGUN_API_KEY = os.environ.get("MAILGUN_API_KEY")
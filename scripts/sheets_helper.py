@@ -12,6 +12,7 @@ This ensures student manual corrections persist across daily script runs!
 """
 
 import os
+import threading
 from typing import Optional
 import pandas as pd
 
@@ -28,12 +29,24 @@ SPREADSHEET_ID = os.environ.get('GOOGLE_SHEET_ID', 'YOUR_SHEET_ID_HERE')
 CREDENTIALS_PATH = os.environ.get('GOOGLE_CREDENTIALS_PATH', 'credentials/google-sheets-credentials.json')
 SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
 
+# Field mask for listing tabs: a bare spreadsheets.get returns every tab's
+# full metadata (formats, rules, protected ranges), not just names and IDs
+TAB_FIELDS = 'sheets.properties(title,sheetId)'
+
 if __name__ != '__main__' and SHEETS_AVAILABLE:
     sheet_id_display = SPREADSHEET_ID[:20] + "..." if len(SPREADSHEET_ID) > 20 else SPREADSHEET_ID
     print(f"[DEBUG] Sheet ID: {sheet_id_display}")
 
+# One API client per thread: building it loads the credentials and the API
+# description, and the underlying httplib2 connection isn't thread-safe
+_local = threading.local()
+
 def get_sheets_service():
-    """Create and return Google Sheets API service."""
+    """Return this thread's Google Sheets API service, creating it on first use."""
+    service = getattr(_local, 'service', None)
+    if service is not None:
+        return service
+    
     if not SHEETS_AVAILABLE:
         raise ImportError("Google Sheets packages not installed")
     
@@ -44,6 +57,7 @@ def get_sheets_service():
         CREDENTIALS_PATH, scopes=SCOPES
     )
     service = build('sheets', 'v4', credentials=credentials)
+    _local.service = service
     return service
 
 def dataframe_to_sheet_values(df: pd.DataFrame) -> list:
@@ -83,7 +97,7 @@ def read_from_sheet(sheet_name: str, date: Optional[str] = None, sheet_id: Optio
         service = get_sheets_service()
         
         # Check if tab exists
-        spreadsheet = service.spreadsheets().get(spreadsheetId=target_sheet_id).execute()
+        spreadsheet = service.spreadsheets().get(spreadsheetId=target_sheet_id, fields=TAB_FIELDS).execute()
         sheet_exists = any(s['properties']['title'] == full_sheet_name for s in spreadsheet['sheets'])
         
         if not sheet_exists:
@@ -232,7 +246,7 @@ def write_to_sheet(
         service = get_sheets_service()
         
         # Check if sheet tab exists
-        spreadsheet = service.spreadsheets().get(spreadsheetId=target_sheet_id).execute()
+        spreadsheet = service.spreadsheets().get(spreadsheetId=target_sheet_id, fields=TAB_FIELDS).execute()
         sheet_exists = any(s['properties']['title'] == full_sheet_name for s in spreadsheet['sheets'])
         
         # If preserving edits and sheet exists, read existing data
@@ -294,7 +308,7 @@ def update_rollup_sheet(
         service = get_sheets_service()
         
         # First, check if the sheet exists
-        spreadsheet = service.spreadsheets().get(spreadsheetId=target_sheet_id).execute()
+        spreadsheet = service.spreadsheets().get(spreadsheetId=target_sheet_id, fields=TAB_FIELDS).execute()
         sheet_exists = any(s['properties']['title'] == sheet_name for s in spreadsheet['sheets'])
         
         combined_df = new_data_df.copy()
@@ -498,7 +512,9 @@ def test_connection():
     
     try:
         service = get_sheets_service()
-        spreadsheet = service.spreadsheets().get(spreadsheetId=SPREADSHEET_ID).execute()
+        spreadsheet = service.spreadsheets().get(
+            spreadsheetId=SPREADSHEET_ID, fields=f'properties.title,{TAB_FIELDS}'
+        ).execute()
         
         title = spreadsheet.get('properties', {}).get('title', 'Unknown')
         sheets = spreadsheet.get('sheets', [])